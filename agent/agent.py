@@ -1,18 +1,35 @@
+import os
 import json
+import time
+import asyncio
+import hashlib
 import logging
+import functools
+import threading
+import contextvars
+from typing import Optional
+from collections import OrderedDict
+from concurrent.futures import ThreadPoolExecutor
 from dotenv import load_dotenv
 from agent.prompt import SYSTEM_PROMPT
-from openai import OpenAI
+from openai import AsyncOpenAI
 from datetime import datetime
 from langgraph.types import Command
+from langgraph.config import get_stream_writer
 from langgraph.graph import StateGraph, START, END
-from langgraph.checkpoint.memory import MemorySaver
 from langchain_core.messages.tool import ToolCall
 from langchain_core.messages import SystemMessage, ToolMessage, AIMessage
 
 from agent.state import tools, Internal_Tools, AgentState
-from agent.tools.retriever import retriever
-from agent.tools.web_search import web_search
+from agent.clients import openai_pool, clients
+from agent.metrics import llm_usage
+from agent.routing import route_turn, route_answer, select_model, tier_usage
+from agent.checkpoint import build_checkpointer
+from agent.context import build_context, verbatim_tool_calls
+from agent.evaluation import plan_evaluation, build_evidence, evaluate_pitch, format_evaluation
+from agent.tools.cache import cached_tool, tool_cache_key, tool_flights
+from agent.tools.retriever import retriever, fetch_documents
+from agent.tools.web_search import web_search, compact_search_results
 from agent.tools.web_scraping import web_scrap
 
 logging.basicConfig(
@@ -21,16 +38,25 @@ logging.basicConfig(
 )
 logger = logging.getLogger(__name__)
 
-LLM_MODEL = "gpt-4o-mini-2024-07-18"
 
 TOOL_REGISTRY = {
-    "web_search": web_search,
+    "web_search": cached_tool("web_search", web_search),
+    # web_scrap caches per URL itself.
     "web_scrap": web_scrap,
-    "rag_retrieve": retriever.func if hasattr(retriever, "func") else retriever
+    "rag_retrieve": cached_tool("rag_retrieve", retriever.func if hasattr(retriever, "func") else retriever),
+    "rag_fetch": cached_tool("rag_fetch", fetch_documents),
 }
 
 load_dotenv()
 
+TOOL_CONCURRENCY = int(os.getenv("TOOL_CONCURRENCY", 8))
+TOOL_TIMEOUT = float(os.getenv("TOOL_TIMEOUT", 60))
+TOOL_THREADS = int(os.getenv("TOOL_THREADS", 4 * TOOL_CONCURRENCY))
+SEEN_RESULTS_MAX = int(os.getenv("SEEN_RESULTS_MAX", 2000))
+PROMPT_PREFIX_CACHE_SIZE = int(os.getenv("PROMPT_PREFIX_CACHE_SIZE", 128))
+MESSAGE_CACHE_SIZE = int(os.getenv("MESSAGE_CACHE_SIZE", 20000))
+MESSAGE_CACHE_MAX_BYTES = int(os.getenv("MESSAGE_CACHE_MAX_BYTES", 64 * 1024 * 1024))
+
 def convert_msg_to_dict(msg):
     """
     Convert LangChain Message objects into OpenAI ChatCompletion message dictionaries.
@@ -80,6 +106,75 @@ def convert_msg_to_dict(msg):
     raise ValueError(f"Unknown message type: {msg}")
 
 
+_converted_messages = OrderedDict()
+_converted_bytes = 0
+
+
+def _converted_size(message: dict) -> int:
+    """Approximate the memory pinned by a converted message: its content and tool call arguments."""
+    size = len(str(message.get("content") or ""))
+    for call in message.get("tool_calls") or []:
+        size += len(call["function"]["arguments"])
+    return size
+
+
+def convert_messages(messages: list) -> list:
+    """
+    Convert a LangChain history to OpenAI message dicts, reusing earlier conversions.
+
+    Conversions are memoized by message id in an LRU shared by all sessions
+    and bounded by both MESSAGE_CACHE_SIZE entries and MESSAGE_CACHE_MAX_BYTES
+    of content (tool outputs such as scraped pages dominate), so each turn
+    only converts the messages appended since the previous one. A cached
+    entry is reused only if the message content is unchanged. Messages
+    without an id (system prompt, summaries, stubs) are converted every time.
+
+    Args:
+        messages (list): LangChain message instances.
+
+    Returns:
+        list: OpenAI-format message dicts.
+    """
+    global _converted_bytes
+
+    converted = []
+    for msg in messages:
+        if not msg.id:
+            converted.append(convert_msg_to_dict(msg))
+            continue
+
+        key = (msg.id, msg.type)
+        cached = _converted_messages.get(key)
+        if cached is not None and cached[0] == msg.content:
+            _converted_messages.move_to_end(key)
+            converted.append(cached[1])
+            continue
+
+        result = convert_msg_to_dict(msg)
+        size = _converted_size(result)
+        if cached is not None:
+            _converted_bytes -= cached[2]
+        _converted_messages[key] = (msg.content, result, size)
+        _converted_messages.move_to_end(key)
+        _converted_bytes += size
+        while len(_converted_messages) > MESSAGE_CACHE_SIZE or _converted_bytes > MESSAGE_CACHE_MAX_BYTES:
+            _, (_, _, evicted_size) = _converted_messages.popitem(last=False)
+            _converted_bytes -= evicted_size
+        converted.append(result)
+
+    return converted
+
+
+def message_cache_stats() -> dict:
+    """Return the entry count and content bytes held by the message conversion cache."""
+    return {
+        "entries": len(_converted_messages),
+        "bytes": _converted_bytes,
+        "max_entries": MESSAGE_CACHE_SIZE,
+        "max_bytes": MESSAGE_CACHE_MAX_BYTES,
+    }
+
+
 def from_openai_msg(msg):
     """
     Convert an OpenAI-completion-style message dict back into a LangChain AIMessage.
@@ -145,10 +240,175 @@ def tools_to_description_string(tools: list) -> str:
 
     return "\n".join(lines).strip()
 
+async def stream_completion(client: AsyncOpenAI, forward_tokens: bool = True, stop_at_answer: bool = False, **kwargs) -> tuple:
+    """
+    Run a streaming chat completion, forwarding content tokens to the graph's
+    custom stream as they arrive, and reassemble the final assistant message.
+
+    Args:
+        client (AsyncOpenAI): Client used for the request.
+        forward_tokens (bool): Forward content tokens to the custom stream.
+        stop_at_answer (bool): Close the stream at the first content delta
+            that comes before any tool call, i.e. as soon as the model starts
+            answering instead of planning tools.
+        **kwargs: Arguments forwarded to ``chat.completions.create``.
+
+    Returns:
+        tuple: (the assistant message in the same shape as ``ChatCompletionMessage.model_dump()``,
+        or None if stopped at the answer, and the usage reported in the final chunk)
+    """
+    writer = get_stream_writer() if forward_tokens else None
+    content = []
+    tool_calls = {}
+    usage = None
+
+    stream = await client.chat.completions.create(stream=True, stream_options={"include_usage": True}, **kwargs)
+    async for chunk in stream:
+        if chunk.usage is not None:
+            usage = chunk.usage
+        if not chunk.choices:
+            continue
+        delta = chunk.choices[0].delta
+
+        if delta.content:
+            if stop_at_answer and not tool_calls and not delta.tool_calls:
+                await stream.close()
+                return None, usage
+            content.append(delta.content)
+            if writer:
+                writer({"event": "token", "content": delta.content})
+
+        for part in delta.tool_calls or []:
+            call = tool_calls.setdefault(part.index, {
+                "id": None,
+                "type": "function",
+                "function": {"name": "", "arguments": ""},
+            })
+            if part.id:
+                call["id"] = part.id
+            if part.function and part.function.name:
+                call["function"]["name"] += part.function.name
+            if part.function and part.function.arguments:
+                call["function"]["arguments"] += part.function.arguments
+
+    message = {
+        "role": "assistant",
+        "content": "".join(content) or None,
+        "tool_calls": [tool_calls[i] for i in sorted(tool_calls)] or None,
+    }
+    return message, usage
+
+async def complete(client: AsyncOpenAI, tier: str, reason: str, messages: list, tools: list, stream: bool,
+                   probe: bool = False) -> Optional[dict]:
+    """
+    Run one reasoning completion on the model of ``tier`` and record its usage.
+
+    Args:
+        client (AsyncOpenAI): Client used for the request.
+        tier (str): Model tier, see agent.routing.
+        reason (str): Routing reason, counted in the routing metrics.
+        messages (list): OpenAI-format messages.
+        tools (list): Tool schemas offered to the model.
+        stream (bool): Forward content tokens to the graph's custom stream.
+        probe (bool): Only keep a tool-planning reply: the completion is
+            streamed without forwarding tokens and stopped as soon as the
+            model starts answering.
+
+    Returns:
+        dict: The assistant message in the shape of ``ChatCompletionMessage.model_dump()``,
+        or None if a probe was stopped at the answer.
+    """
+    request = {
+        "model": select_model(tier, reason),
+        "messages": messages,
+        "tools": tools,
+        "tool_choice": "auto",
+    }
+
+    start = time.perf_counter()
+    if probe:
+        choice, usage = await stream_completion(client, forward_tokens=False, stop_at_answer=True, **request)
+    elif stream:
+        choice, usage = await stream_completion(client, **request)
+    else:
+        decision = await client.chat.completions.create(**request)
+        choice = decision.choices[0].message.model_dump()
+        usage = decision.usage
+    latency = time.perf_counter() - start
+
+    llm_usage.record(usage, latency)
+    tier_usage[tier].record(usage, latency)
+    if usage is not None:
+        logger.info(f"LLM returned a decision. Prompt tokens: {usage.prompt_tokens}, cached: {llm_usage.cached_tokens_of(usage)}.")
+    else:
+        logger.info("LLM returned a decision.")
+    return choice
+
+def merge_tool_results(state: AgentState) -> list:
+    """
+    Combine client-supplied external tool results with internal results that
+    were executed server-side in the same turn.
+
+    Results are ordered like the tool calls of the last assistant message so
+    the replayed ToolMessages follow the order the model asked for them.
+
+    Args:
+        state (AgentState): Full graph state.
+
+    Returns:
+        list: Tool result dicts with ``content`` and ``tool_call_id``.
+    """
+    results = (state.get("internal_tool_results") or []) + (state.get("tool_results") or [])
+    if not state.get("internal_tool_results"):
+        return results
+
+    last_ai = next((m for m in reversed(state.get("messages") or []) if m.type == "ai"), None)
+    order = {call["id"]: i for i, call in enumerate(last_ai.tool_calls)} if last_ai else {}
+
+    return sorted(results, key=lambda t: order.get(t["tool_call_id"], len(order)))
+
 def get_current_datetime_str():
     return datetime.now().strftime("%Y-%m-%d %H:%M:%S")
 
-def reasoning_node(state: AgentState, config):
+_prompt_prefixes = OrderedDict()
+
+def build_prompt_prefix(external_tools: list) -> tuple:
+    """
+    Build the stable part of every request: the system prompt with the
+    external tool descriptions, and the tools array.
+
+    Both only depend on ``external_tools``, so they are memoized by a hash of
+    its content and reused byte-for-byte across turns and sessions, which
+    keeps the request prefix eligible for provider-side prompt caching.
+
+    Args:
+        external_tools (list): Tool definitions supplied by the client.
+
+    Returns:
+        tuple: (system prompt content, tools array)
+    """
+    key = hashlib.sha256(json.dumps(external_tools, sort_keys=True, default=str).encode()).hexdigest()
+    prefix = _prompt_prefixes.get(key)
+    if prefix is not None:
+        _prompt_prefixes.move_to_end(key)
+        return prefix
+
+    external_tool_desc = ''
+
+    try:
+        external_tool_desc = "\n\nExternal Tools Attached : \n\n" + tools_to_description_string(external_tools)
+        logger.info("External tool description generated sucessfully")
+
+    except Exception as e:
+        logger.info(f"Error when generating tool desciption. Fallback to no tool description : {e}")
+
+    prefix = (SYSTEM_PROMPT + external_tool_desc, tools + list(external_tools))
+    _prompt_prefixes[key] = prefix
+    while len(_prompt_prefixes) > PROMPT_PREFIX_CACHE_SIZE:
+        _prompt_prefixes.popitem(last=False)
+    return prefix
+
+async def reasoning_node(state: AgentState, config):
     """
     Perform LLM reasoning. Decide whether to:
     - Respond normally
@@ -165,57 +425,68 @@ def reasoning_node(state: AgentState, config):
     logger.info("Entering reasoning_node.")
     logger.debug(f"Incoming state: {state}")
 
-    openai_messages = []
     tool_messages = []
 
-    external_tool_desc = ''
-
-    try:
-        external_tool_desc = "\n\nExternal Tools Attached : \n\n" + tools_to_description_string(state["external_tools"])
-        logger.info("External tool description generated sucessfully")
-
-    except Exception as e:
-        logger.info(f"Error when generating tool desciption. Fallback to no tool description : {e}")
+    # Stable prefix first (system prompt, tools, history); the date changes
+    # every request, so it goes in a trailing system message.
+    system_prompt, runtime_tools = build_prompt_prefix(state["external_tools"])
 
-    date_and_time = "Today's date and time :\n" + get_current_datetime_str() + "\n\n"
+    history = list(state.get("messages") or [])
 
-    messages = [SystemMessage(content=date_and_time + SYSTEM_PROMPT + external_tool_desc)]
-    if state.get("messages"):
-        messages += state["messages"]
-
-    if state.get("tool_results"):
+    tool_results = merge_tool_results(state)
+    if tool_results:
         logger.info("Adding tool results back into message context.")
-        for t in state["tool_results"]:
+        for t in tool_results:
             tool_messages.append(
                 ToolMessage(content=t["content"], tool_call_id=t["tool_call_id"])
             )
-        messages.extend(tool_messages)
+        history.extend(tool_messages)
+
+    async with openai_pool.client(config["configurable"]["api_key"]) as client:
+        # Keep the history within CONTEXT_TOKEN_BUDGET (stale tool stubs, rolling summary).
+        history, context_updates = await build_context(
+            history,
+            state.get("context_summary") or "",
+            state.get("summarized_count") or 0,
+            client,
+        )
 
-    for msg in messages:
-        openai_messages.append(convert_msg_to_dict(msg))
+        # Results whose output was stubbed or summarized away may be fetched again.
+        seen_results = session_seen_results(state)
+        live = verbatim_tool_calls(history)
+        if any(call_id not in live for call_id in seen_results):
+            context_updates["seen_results"] = {
+                call_id: keys for call_id, keys in seen_results.items() if call_id in live
+            }
 
-    runtime_tools = tools + state["external_tools"]
-    logger.info(f"Calling LLM with {len(openai_messages)} messages and {len(runtime_tools)} tools.")
+        messages = [SystemMessage(content=system_prompt)] + history
+        messages.append(SystemMessage(content="Today's date and time :\n" + get_current_datetime_str()))
 
-    client = OpenAI(api_key=config["configurable"]["api_key"])
-    decision = client.chat.completions.create(
-        model=LLM_MODEL,
-        messages=openai_messages,
-        tools=runtime_tools,
-        tool_choice="auto",
-    )
+        openai_messages = convert_messages(messages)
 
-    choice = decision.choices[0].message
-    logger.info("LLM returned a decision.")
+        tier, reason = route_turn(history)
+        answer_route = route_answer(history, tier)
+        stream = bool(config["configurable"].get("stream_tokens"))
 
-    lc_messages = from_openai_msg(choice.model_dump())
+        logger.info(f"Calling LLM with {len(openai_messages)} messages and {len(runtime_tools)} tools.")
+        # When the answer belongs on another tier, the planner call only plans
+        # tools and is cut off at its first answer token.
+        choice = await complete(client, tier, reason, openai_messages, runtime_tools, stream, probe=answer_route is not None)
+        if answer_route is not None and not (choice or {}).get("tool_calls"):
+            tier, reason = answer_route
+            logger.info(f"Planner started answering; writing the answer on the {tier} tier.")
+            choice = await complete(client, tier, reason, openai_messages, runtime_tools, stream)
+
+    lc_messages = from_openai_msg(choice)
     lc_messages = tool_messages + [lc_messages]
 
-    if choice.tool_calls is None:
+    if not choice.get("tool_calls"):
         logger.info("LLM responded normally (no tool calls).")
         return {
-            "response": choice.content or "",
+            "response": choice.get("content") or "",
             "messages": lc_messages,
+            "internal_tool_results": [],
+            **context_updates,
         }
 
     logger.info("LLM requested tool calls. Classifying internal vs external.")
@@ -223,12 +494,12 @@ def reasoning_node(state: AgentState, config):
     internal = []
     external = []
 
-    for call in choice.tool_calls:
-        args = json.loads(call.function.arguments or "{}")
-        name = call.function.name
+    for call in choice["tool_calls"]:
+        args = json.loads(call["function"]["arguments"] or "{}")
+        name = call["function"]["name"]
 
         call_plan = {
-            "tool_call_id": call.id,
+            "tool_call_id": call["id"],
             "params": {"name": name, "arguments": args}
         }
 
@@ -237,17 +508,19 @@ def reasoning_node(state: AgentState, config):
         else:
             external.append(call_plan)
 
-    if internal and external:
-        logger.error("Mixed internal & external tool calls detected!")
-        raise ValueError("Mixed internal and external tool calls are not allowed.")
-
     if internal:
-        logger.info(f"Routing {len(internal)} INTERNAL tool calls to tool_node.")
+        if external:
+            logger.info(f"Mixed turn: running {len(internal)} INTERNAL calls before returning {len(external)} EXTERNAL calls.")
+        else:
+            logger.info(f"Routing {len(internal)} INTERNAL tool calls to tool_node.")
         return Command(
             update={
                 "tool_call_plan": internal,
+                "pending_external_calls": external,
                 "tools_used": [plan["params"]["name"] for plan in internal],
                 "messages": lc_messages,
+                "internal_tool_results": [],
+                **context_updates,
             },
             goto="tool_node"
         )
@@ -258,12 +531,101 @@ def reasoning_node(state: AgentState, config):
         "tool_call_plan": external,
         "messages": lc_messages,
         "response": None,
+        "internal_tool_results": [],
+        **context_updates,
     }
 
-def tool_node(state: AgentState):
+# Blocking tool calls get their own threads: a call that outlives TOOL_TIMEOUT
+# keeps its thread, and must not starve the default executor used by checkpoint I/O.
+tool_executor = ThreadPoolExecutor(max_workers=TOOL_THREADS, thread_name_prefix="tool")
+
+async def run_tool(name: str, args: dict):
+    """
+    Async adapter around the blocking TOOL_REGISTRY callables.
+
+    The Tavily, Cosmos and embedding clients are synchronous, so each call is
+    pushed onto ``tool_executor`` (TOOL_THREADS threads, shared by all
+    sessions) to keep the event loop free for other sessions while the
+    upstream request is in flight. Identical concurrent calls (same tool,
+    same normalized arguments) share a single upstream call.
+
+    Args:
+        name (str): Registered internal tool name.
+        args (dict): Keyword arguments produced by the LLM.
+
+    Returns:
+        Any: The raw tool result.
+    """
+    if name not in TOOL_REGISTRY:
+        logger.error(f"Unknown internal tool requested: {name}")
+        raise ValueError(f"Unknown tool: {name}")
+
+    return await tool_flights.do(
+        name,
+        tool_cache_key(name, args),
+        lambda: asyncio.get_running_loop().run_in_executor(
+            tool_executor, functools.partial(contextvars.copy_context().run, TOOL_REGISTRY[name], **args)
+        ),
+    )
+
+async def execute_tool_call(tool_call: dict, writer):
+    """
+    Run one planned internal tool call with TOOL_TIMEOUT, emitting tool
+    started/finished stream events. Failures are returned as ``{"error": ...}``.
+
+    Args:
+        tool_call (dict): Entry of a tool_call_plan.
+        writer: The graph stream writer.
+
+    Returns:
+        Any: The tool result or error dict.
+    """
+    name = tool_call["params"]["name"]
+    args = tool_call["params"]["arguments"]
+
+    logger.info(f"Executing internal tool: {name} with args {args}")
+    writer({"event": "tool", "status": "started", "name": name, "tool_call_id": tool_call["tool_call_id"]})
+
+    try:
+        result = await asyncio.wait_for(run_tool(name, args), timeout=TOOL_TIMEOUT)
+        logger.debug(f"Tool result for {name}: {result}")
+    except asyncio.TimeoutError:
+        logger.error(f"Internal tool {name} timed out after {TOOL_TIMEOUT}s.")
+        result = {"error": f"Tool '{name}' timed out after {TOOL_TIMEOUT}s."}
+    except Exception as e:
+        logger.exception(f"Internal tool {name} failed.")
+        result = {"error": f"Tool '{name}' failed: {e}"}
+
+    writer({"event": "tool", "status": "finished", "name": name, "tool_call_id": tool_call["tool_call_id"]})
+    return result
+
+def session_seen_results(state: AgentState) -> dict:
+    """
+    Return a copy of ``seen_results``: the keys of the web_search results
+    already sent in this session, grouped by the tool call that returned them.
+    """
+    seen_results = state.get("seen_results")
+    # Sessions checkpointed before the keys were grouped hold a flat list.
+    return dict(seen_results) if isinstance(seen_results, dict) else {}
+
+async def tool_node(state: AgentState):
     """
     Execute INTERNAL tools inside the graph (NOT returned to backend).
 
+    Calls in the plan run concurrently, at most TOOL_CONCURRENCY at a time,
+    each bounded by TOOL_TIMEOUT. A failing or timed-out call is reported to
+    the model as an error result instead of failing the whole turn.
+
+    If the same turn also asked for external tools, the internal results are
+    stored in ``internal_tool_results`` and the external calls are handed back
+    to the client; reasoning_node merges both sets on the follow-up request.
+
+    web_search results are compacted in plan order against ``seen_results``
+    so a URL or page already shown in this session is not sent again. The
+    keys are stored per tool_call_id; reasoning_node drops those of outputs
+    that build_context stubbed or summarized, so the model can fetch them
+    again.
+
     Args:
         state (AgentState): Current agent state containing tool_call_plan.
 
@@ -274,45 +636,133 @@ def tool_node(state: AgentState):
     logger.info("Entering tool_node for internal tool execution.")
     logger.debug(f"Tool call plan: {state['tool_call_plan']}")
 
-    response = []
+    writer = get_stream_writer()
+    semaphore = asyncio.Semaphore(TOOL_CONCURRENCY)
 
-    for tool_call in state["tool_call_plan"]:
-        name = tool_call["params"]["name"]
-        args = tool_call["params"]["arguments"]
+    async def execute(tool_call):
+        async with semaphore:
+            return await execute_tool_call(tool_call, writer)
 
-        logger.info(f"Executing internal tool: {name} with args {args}")
+    # gather preserves the plan order, so results line up with their tool_call_ids.
+    results = await asyncio.gather(*(execute(tool_call) for tool_call in state["tool_call_plan"]))
 
-        if name not in TOOL_REGISTRY:
-            logger.error(f"Unknown internal tool requested: {name}")
-            raise ValueError(f"Unknown tool: {name}")
-
-        result = TOOL_REGISTRY[name](**args)
-        logger.debug(f"Tool result for {name}: {result}")
-
-        tool_result = {
+    seen_results = session_seen_results(state)
+    seen = {key for keys in seen_results.values() for key in keys}
+    response = []
+    for tool_call, result in zip(state["tool_call_plan"], results):
+        if tool_call["params"]["name"] == "web_search":
+            result, new_keys = compact_search_results(result, seen)
+            if new_keys:
+                seen_results[tool_call["tool_call_id"]] = new_keys
+        response.append({
             "content": json.dumps(result),
             "tool_call_id": tool_call["tool_call_id"]
-        }
-        response.append(tool_result)
+        })
+
+    # Forget the oldest calls first once over SEEN_RESULTS_MAX keys.
+    seen_count = sum(len(keys) for keys in seen_results.values())
+    while seen_count > SEEN_RESULTS_MAX:
+        seen_count -= len(seen_results.pop(next(iter(seen_results))))
 
     logger.info("Finished executing internal tools.")
+
+    external = state.get("pending_external_calls") or []
+    if external:
+        logger.info(f"Returning {len(external)} EXTERNAL tool calls to backend after internal execution.")
+        return {
+            "tools_used": [plan["params"]["name"] for plan in external],
+            "tool_call_plan": external,
+            "pending_external_calls": [],
+            "internal_tool_results": response,
+            "tool_results": [],
+            "response": None,
+            "seen_results": seen_results,
+        }
+
+    return {
+        "tools_used": [],
+        "tool_call_plan": [],
+        "tool_results": response,
+        "seen_results": seen_results,
+    }
+
+async def evaluation_node(state: AgentState, config):
+    """
+    Fast path for ``mode="evaluate"``: score the pitch in ``query`` with a
+    fixed plan instead of the open-ended reasoning loop.
+
+    All evidence tools run in one parallel wave, then a single
+    structured-output completion fills the rubric; the total and the
+    recommendation are computed in Python (see agent.evaluation).
+
+    Args:
+        state (AgentState): Full graph state.
+
+    Returns:
+        dict: The formatted evaluation as ``response`` plus the structured ``evaluation``.
+    """
+    logger.info("Entering evaluation_node.")
+
+    pitch = state["query"]
+    plan = plan_evaluation(pitch, state.get("company"), state.get("market"))
+    writer = get_stream_writer()
+
+    results = await asyncio.gather(*(execute_tool_call(tool_call, writer) for tool_call in plan))
+    evidence = build_evidence(plan, results)
+
+    model = select_model("final", "structured pitch evaluation")
+    async with openai_pool.client(config["configurable"]["api_key"]) as client:
+        start = time.perf_counter()
+        evaluation, usage = await evaluate_pitch(client, model, pitch, evidence)
+        latency = time.perf_counter() - start
+    llm_usage.record(usage)
+    tier_usage["final"].record(usage, latency)
+
+    response = format_evaluation(evaluation)
+    logger.info(f"Pitch evaluated with {len(plan)} tool calls: {evaluation['total_score']}/100, {evaluation['recommendation']}.")
+
     return {
+        "response": response,
+        "evaluation": evaluation,
+        "messages": [AIMessage(content=response)],
         "tools_used": [],
         "tool_call_plan": [],
-        "tool_results": response
+        "internal_tool_results": [],
     }
 
+def route_start(state: AgentState):
+    """Pitch evaluations take the fixed-plan fast path; everything else goes through reasoning."""
+    return "evaluation_node" if state.get("mode") == "evaluate" and state.get("query") else "reasoning_node"
+
+def route_after_tools(state: AgentState):
+    """Go back to reasoning unless external calls are still waiting on the client."""
+    return END if state.get("tool_call_plan") else "reasoning_node"
+
 
 builder = StateGraph(AgentState)
-memory = MemorySaver()
+# Built on first use (or by clients.warmup in the app lifespan), so importing
+# the agent does not open or create the checkpoint database.
+clients.register("checkpointer", build_checkpointer)
 
 builder.add_node("reasoning_node", reasoning_node)
 builder.add_node("tool_node", tool_node)
+builder.add_node("evaluation_node", evaluation_node)
 
-builder.add_edge(START, "reasoning_node")
-builder.add_edge("tool_node", "reasoning_node")
+builder.add_conditional_edges(START, route_start, ["reasoning_node", "evaluation_node"])
+builder.add_edge("evaluation_node", END)
+builder.add_conditional_edges("tool_node", route_after_tools, ["reasoning_node", END])
 builder.add_edge("reasoning_node", END)
 
-graph = builder.compile(checkpointer=memory)
+_graph = None
+_graph_lock = threading.Lock()
+
 
-logger.info("Agent graph compiled successfully.")
+def get_graph():
+    """Return the compiled agent graph, building it and its checkpointer on first use."""
+    global _graph
+    if _graph is None:
+        with _graph_lock:
+            if _graph is None:
+                _graph = builder.compile(checkpointer=clients.get("checkpointer"))
+                logger.info("Agent graph compiled successfully.")
+    return _graph
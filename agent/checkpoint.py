@@ -0,0 +1,367 @@
+import os
+import time
+import sqlite3
+import asyncio
+import logging
+import threading
+from collections import OrderedDict
+
+from dotenv import load_dotenv
+from langgraph.checkpoint.memory import InMemorySaver
+from langgraph.checkpoint.sqlite import SqliteSaver
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+SESSION_MAX_COUNT = int(os.getenv("SESSION_MAX_COUNT", 1000))
+SESSION_IDLE_TTL = float(os.getenv("SESSION_IDLE_TTL", 6 * 60 * 60))
+SESSION_MAX_BYTES = int(os.getenv("SESSION_MAX_BYTES", 512 * 1024 * 1024))
+SESSION_MAX_CHECKPOINTS = int(os.getenv("SESSION_MAX_CHECKPOINTS", 1))
+
+CHECKPOINT_BACKEND = os.getenv("CHECKPOINT_BACKEND", "sqlite")
+# Resolved once, so the database does not follow later changes of the working directory.
+CHECKPOINT_SQLITE_PATH = os.path.abspath(os.getenv("CHECKPOINT_SQLITE_PATH", "checkpoints.sqlite"))
+CHECKPOINT_SQLITE_BUSY_TIMEOUT = float(os.getenv("CHECKPOINT_SQLITE_BUSY_TIMEOUT", 30))
+CHECKPOINT_PRUNE_INTERVAL = float(os.getenv("CHECKPOINT_PRUNE_INTERVAL", 60))
+
+
+def _sizeof(value) -> int:
+    """Approximate the resident size of serialized checkpoint data by summing its bytes/str payloads."""
+    if isinstance(value, (bytes, bytearray, str)):
+        return len(value)
+    if isinstance(value, dict):
+        return sum(_sizeof(v) for v in value.values())
+    if isinstance(value, (tuple, list)):
+        return sum(_sizeof(v) for v in value)
+    return 0
+
+
+class BoundedMemorySaver(InMemorySaver):
+    """
+    In-process checkpointer that bounds how many sessions it keeps resident.
+
+    Sessions (thread ids) are tracked in LRU order together with the size of
+    their serialized checkpoints, blobs and pending writes. After every write
+    the least recently used sessions are evicted until the session count and
+    byte budget are respected; sessions idle for longer than the TTL are
+    evicted as well. The session being written is never evicted by its own
+    write.
+
+    Within a session only the latest ``max_checkpoints`` checkpoints are
+    kept: older ones are superseded, so their pending writes and the channel
+    blobs no kept checkpoint references are dropped on every put. A long
+    active session therefore costs the size of its current state, not of
+    its whole step history. (This assumes no DeltaChannel in the graph
+    state, which rebuilds values from ancestor checkpoints.)
+    """
+
+    def __init__(
+        self,
+        max_sessions: int = SESSION_MAX_COUNT,
+        idle_ttl: float = SESSION_IDLE_TTL,
+        max_bytes: int = SESSION_MAX_BYTES,
+        max_checkpoints: int = SESSION_MAX_CHECKPOINTS,
+        **kwargs,
+    ):
+        super().__init__(**kwargs)
+        self.max_sessions = max_sessions
+        self.idle_ttl = idle_ttl
+        self.max_bytes = max_bytes
+        self.max_checkpoints = max(max_checkpoints, 1)
+        self.evictions = 0
+        self._total_bytes = 0
+        self._sessions: "OrderedDict[str, list]" = OrderedDict()
+        self._blob_keys = {}
+        self._lock = threading.RLock()
+
+    def _touch(self, thread_id: str, delta: int = 0):
+        entry = self._sessions.pop(thread_id, None) or [0, 0.0]
+        entry[0] += delta
+        entry[1] = time.monotonic()
+        self._sessions[thread_id] = entry
+        self._total_bytes += delta
+
+    def _enforce_limits(self, active_thread_id: str):
+        now = time.monotonic()
+        for thread_id in list(self._sessions):
+            if thread_id == active_thread_id:
+                continue
+
+            size, last_used = self._sessions[thread_id]
+            over_budget = (
+                len(self._sessions) > self.max_sessions
+                or self._total_bytes > self.max_bytes
+                or now - last_used > self.idle_ttl
+            )
+            if not over_budget:
+                break
+
+            logger.info(f"Evicting session {thread_id} ({size} bytes) from checkpointer.")
+            self.delete_thread(thread_id)
+            self.evictions += 1
+
+    def _prune_superseded(self, thread_id: str, checkpoint_ns: str) -> int:
+        """Drop all but the latest ``max_checkpoints`` checkpoints of a thread; return the bytes freed."""
+        checkpoints = self.storage[thread_id][checkpoint_ns]
+        if len(checkpoints) <= self.max_checkpoints:
+            return 0
+
+        freed = 0
+        for checkpoint_id in sorted(checkpoints)[:-self.max_checkpoints]:
+            freed += _sizeof(checkpoints.pop(checkpoint_id))
+            freed += _sizeof(self.writes.pop((thread_id, checkpoint_ns, checkpoint_id), None))
+
+        referenced = set()
+        for saved in checkpoints.values():
+            referenced.update(self.serde.loads_typed(saved[0])["channel_versions"].items())
+
+        blob_keys = self._blob_keys.get(thread_id, set())
+        for key in [key for key in blob_keys if key[1] == checkpoint_ns and key[2:] not in referenced]:
+            blob_keys.discard(key)
+            freed += _sizeof(self.blobs.pop(key, None))
+        return freed
+
+    def get_tuple(self, config):
+        thread_id = config["configurable"]["thread_id"]
+        with self._lock:
+            if thread_id in self._sessions:
+                self._touch(thread_id)
+            return super().get_tuple(config)
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        thread_id = config["configurable"]["thread_id"]
+        checkpoint_ns = config["configurable"].get("checkpoint_ns", "")
+
+        with self._lock:
+            next_config = super().put(config, checkpoint, metadata, new_versions)
+
+            delta = _sizeof(self.storage[thread_id][checkpoint_ns][checkpoint["id"]])
+            delta += sum(
+                _sizeof(self.blobs.get((thread_id, checkpoint_ns, k, v)))
+                for k, v in new_versions.items()
+            )
+            self._blob_keys.setdefault(thread_id, set()).update(
+                (thread_id, checkpoint_ns, k, v) for k, v in new_versions.items()
+            )
+            delta -= self._prune_superseded(thread_id, checkpoint_ns)
+            self._touch(thread_id, delta)
+            self._enforce_limits(thread_id)
+
+        return next_config
+
+    def put_writes(self, config, writes, task_id, task_path=""):
+        thread_id = config["configurable"]["thread_id"]
+        outer_key = (
+            thread_id,
+            config["configurable"].get("checkpoint_ns", ""),
+            config["configurable"]["checkpoint_id"],
+        )
+
+        with self._lock:
+            if outer_key[2] not in self.storage.get(thread_id, {}).get(outer_key[1], {}):
+                # Late writes for a checkpoint that was already superseded and pruned.
+                return
+            before = _sizeof(self.writes.get(outer_key))
+            super().put_writes(config, writes, task_id, task_path)
+            self._touch(thread_id, _sizeof(self.writes.get(outer_key)) - before)
+            self._enforce_limits(thread_id)
+
+    def delete_thread(self, thread_id: str):
+        with self._lock:
+            super().delete_thread(thread_id)
+            self._blob_keys.pop(thread_id, None)
+            entry = self._sessions.pop(thread_id, None)
+            if entry is not None:
+                self._total_bytes -= entry[0]
+
+    def stats(self) -> dict:
+        """Return resident session/byte gauges and the eviction counter."""
+        return {
+            "backend": "memory",
+            "sessions": len(self._sessions),
+            "bytes": self._total_bytes,
+            "max_sessions": self.max_sessions,
+            "max_bytes": self.max_bytes,
+            "idle_ttl": self.idle_ttl,
+            "max_checkpoints": self.max_checkpoints,
+            "evictions": self.evictions,
+        }
+
+
+class SqliteCheckpointSaver(SqliteSaver):
+    """
+    Durable checkpointer backed by a local SQLite file in WAL mode.
+
+    WAL lets any number of uvicorn workers read sessions while one of them
+    writes, and the busy timeout makes concurrent writers from other processes
+    wait for the lock instead of failing. put/put_writes calls are short
+    transactions (pending writes of a task go in one executemany), and with
+    ``synchronous=NORMAL`` commits are not fsynced individually, so a graph
+    step costs a few cheap appends to the WAL.
+
+    Retention matches the in-memory backend: every put keeps only the latest
+    ``max_checkpoints`` checkpoints of the thread (and their pending writes),
+    and at most every ``prune_interval`` seconds sessions idle for longer
+    than ``idle_ttl`` are deleted. Last-use times live in a small
+    ``checkpoint_threads`` table indexed by time, which also makes the
+    session count in ``stats`` cheap. Freed pages are reused by SQLite, so
+    the file stops growing once the retained data is stable.
+
+    The upstream SqliteSaver is synchronous only; the async interface used by
+    ``graph.ainvoke`` is provided by running those methods on the default
+    thread pool.
+    """
+
+    def __init__(
+        self,
+        path: str = CHECKPOINT_SQLITE_PATH,
+        busy_timeout: float = CHECKPOINT_SQLITE_BUSY_TIMEOUT,
+        idle_ttl: float = SESSION_IDLE_TTL,
+        max_checkpoints: int = SESSION_MAX_CHECKPOINTS,
+        prune_interval: float = CHECKPOINT_PRUNE_INTERVAL,
+        **kwargs,
+    ):
+        os.makedirs(os.path.dirname(os.path.abspath(path)), exist_ok=True)
+        conn = sqlite3.connect(path, timeout=busy_timeout, check_same_thread=False)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        super().__init__(conn, **kwargs)
+        self.path = path
+        self.idle_ttl = idle_ttl
+        self.max_checkpoints = max(max_checkpoints, 1)
+        self.prune_interval = prune_interval
+        self.evictions = 0
+        self._last_prune = 0.0
+
+    def setup(self):
+        if self.is_setup:
+            return
+        super().setup()
+        self.conn.executescript(
+            """
+            CREATE TABLE IF NOT EXISTS checkpoint_threads (
+                thread_id TEXT PRIMARY KEY,
+                last_used REAL NOT NULL
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS checkpoint_threads_last_used ON checkpoint_threads (last_used);
+            """
+        )
+        # Databases written before retention existed: start their sessions' idle clock now.
+        self.conn.execute(
+            "INSERT OR IGNORE INTO checkpoint_threads (thread_id, last_used) "
+            "SELECT DISTINCT thread_id, ? FROM checkpoints WHERE NOT EXISTS (SELECT 1 FROM checkpoint_threads LIMIT 1)",
+            (time.time(),),
+        )
+        self.conn.commit()
+
+    def put(self, config, checkpoint, metadata, new_versions):
+        next_config = super().put(config, checkpoint, metadata, new_versions)
+        thread_id = str(config["configurable"]["thread_id"])
+        checkpoint_ns = config["configurable"]["checkpoint_ns"]
+
+        with self.cursor() as cur:
+            cur.execute(
+                "INSERT OR REPLACE INTO checkpoint_threads (thread_id, last_used) VALUES (?, ?)",
+                (thread_id, time.time()),
+            )
+            cur.execute(
+                "SELECT checkpoint_id FROM checkpoints WHERE thread_id = ? AND checkpoint_ns = ? "
+                "ORDER BY checkpoint_id DESC LIMIT 1 OFFSET ?",
+                (thread_id, checkpoint_ns, self.max_checkpoints - 1),
+            )
+            row = cur.fetchone()
+            if row is not None:
+                for table in ("checkpoints", "writes"):
+                    cur.execute(
+                        f"DELETE FROM {table} WHERE thread_id = ? AND checkpoint_ns = ? AND checkpoint_id < ?",
+                        (thread_id, checkpoint_ns, row[0]),
+                    )
+
+        if time.monotonic() - self._last_prune >= self.prune_interval:
+            self.prune_idle()
+        return next_config
+
+    def prune_idle(self) -> int:
+        """Delete sessions idle for longer than ``idle_ttl``; return how many were deleted."""
+        self._last_prune = time.monotonic()
+        with self.cursor() as cur:
+            cur.execute(
+                "SELECT thread_id FROM checkpoint_threads WHERE last_used < ?",
+                (time.time() - self.idle_ttl,),
+            )
+            thread_ids = [(row[0],) for row in cur.fetchall()]
+            for table in ("checkpoints", "writes", "checkpoint_threads"):
+                cur.executemany(f"DELETE FROM {table} WHERE thread_id = ?", thread_ids)
+
+        if thread_ids:
+            logger.info(f"Pruned {len(thread_ids)} idle sessions from the checkpoint database.")
+            self.evictions += len(thread_ids)
+        return len(thread_ids)
+
+    def delete_thread(self, thread_id: str):
+        super().delete_thread(thread_id)
+        with self.cursor() as cur:
+            cur.execute("DELETE FROM checkpoint_threads WHERE thread_id = ?", (str(thread_id),))
+
+    async def aget_tuple(self, config):
+        return await asyncio.to_thread(self.get_tuple, config)
+
+    async def alist(self, config, *, filter=None, before=None, limit=None):
+        items = await asyncio.to_thread(
+            lambda: list(self.list(config, filter=filter, before=before, limit=limit))
+        )
+        for item in items:
+            yield item
+
+    async def aput(self, config, checkpoint, metadata, new_versions):
+        return await asyncio.to_thread(self.put, config, checkpoint, metadata, new_versions)
+
+    async def aput_writes(self, config, writes, task_id, task_path=""):
+        return await asyncio.to_thread(self.put_writes, config, writes, task_id, task_path)
+
+    async def adelete_thread(self, thread_id: str):
+        return await asyncio.to_thread(self.delete_thread, thread_id)
+
+    async def aget_delta_channel_history(self, *, config, channels):
+        return await asyncio.to_thread(self.get_delta_channel_history, config=config, channels=channels)
+
+    def stats(self) -> dict:
+        """Return the number of stored sessions, the on-disk size of the database and the prune counter."""
+        with self.cursor(transaction=False) as cur:
+            cur.execute("SELECT COUNT(*) FROM checkpoint_threads")
+            sessions = cur.fetchone()[0]
+
+        size = sum(
+            os.path.getsize(self.path + suffix)
+            for suffix in ("", "-wal")
+            if os.path.exists(self.path + suffix)
+        )
+        return {
+            "backend": "sqlite",
+            "sessions": sessions,
+            "bytes": size,
+            "idle_ttl": self.idle_ttl,
+            "max_checkpoints": self.max_checkpoints,
+            "evictions": self.evictions,
+        }
+
+
+def build_checkpointer():
+    """
+    Build the checkpointer selected by CHECKPOINT_BACKEND.
+
+    - ``sqlite`` (default): durable, shared by every worker on the host.
+    - ``memory``: bounded in-process store; sessions are local to one worker.
+
+    Returns:
+        BaseCheckpointSaver: The configured checkpointer.
+    """
+    if CHECKPOINT_BACKEND == "sqlite":
+        logger.info(f"Using 'sqlite' checkpoint backend at {CHECKPOINT_SQLITE_PATH}.")
+        return SqliteCheckpointSaver()
+    if CHECKPOINT_BACKEND == "memory":
+        logger.info("Using 'memory' checkpoint backend.")
+        return BoundedMemorySaver()
+
+    raise ValueError(f"Unknown CHECKPOINT_BACKEND: {CHECKPOINT_BACKEND}")
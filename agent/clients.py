@@ -0,0 +1,239 @@
+import os
+import time
+import asyncio
+import hashlib
+import logging
+import threading
+from collections import OrderedDict
+from contextlib import asynccontextmanager
+
+from dotenv import load_dotenv
+from openai import AsyncOpenAI
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+OPENAI_CLIENT_POOL_SIZE = int(os.getenv("OPENAI_CLIENT_POOL_SIZE", 32))
+OPENAI_CLIENT_IDLE_TTL = float(os.getenv("OPENAI_CLIENT_IDLE_TTL", 300))
+CLIENT_WARMUP = os.getenv("CLIENT_WARMUP")
+
+
+class _PooledClient:
+    """Bookkeeping for one pooled AsyncOpenAI client."""
+
+    def __init__(self, client: AsyncOpenAI):
+        self.client = client
+        self.in_use = 0
+        self.last_used = time.monotonic()
+        self.evicted = False
+
+
+class OpenAIClientPool:
+    """
+    Bounded, LRU-evicted pool of AsyncOpenAI clients keyed by API key.
+
+    Each client owns an httpx connection pool, so reusing one across requests
+    and reasoning turns keeps TLS sessions and keep-alive connections warm.
+    Clients are closed when they are evicted (LRU or idle TTL) and no request
+    is still using them.
+    """
+
+    def __init__(self, max_size: int = OPENAI_CLIENT_POOL_SIZE, idle_ttl: float = OPENAI_CLIENT_IDLE_TTL):
+        self.max_size = max_size
+        self.idle_ttl = idle_ttl
+        self.hits = 0
+        self.misses = 0
+        self.evictions = 0
+        self._entries: "OrderedDict[tuple, _PooledClient]" = OrderedDict()
+
+    @staticmethod
+    def _key(api_key: str) -> tuple:
+        # httpx connections are bound to the loop that opened them, so clients
+        # are never shared across event loops.
+        loop = asyncio.get_running_loop()
+        return id(loop), hashlib.sha256(api_key.encode()).hexdigest()
+
+    def _evict(self, key) -> list:
+        entry = self._entries.pop(key)
+        entry.evicted = True
+        self.evictions += 1
+        return [entry.client] if entry.in_use == 0 else []
+
+    def _evict_idle(self) -> list:
+        now = time.monotonic()
+        to_close = []
+        for key in list(self._entries):
+            entry = self._entries[key]
+            if now - entry.last_used < self.idle_ttl:
+                break
+            if entry.in_use == 0:
+                to_close += self._evict(key)
+        return to_close
+
+    @staticmethod
+    async def _close(clients: list):
+        for client in clients:
+            try:
+                await client.close()
+            except Exception as e:
+                logger.warning(f"Failed to close pooled OpenAI client : {e}")
+
+    @asynccontextmanager
+    async def client(self, api_key: str):
+        """
+        Borrow the pooled client for ``api_key``, creating it on a miss.
+
+        Args:
+            api_key (str): OpenAI API key the client authenticates with.
+
+        Yields:
+            AsyncOpenAI: A client that stays open for the duration of the block.
+        """
+        key = self._key(api_key)
+
+        # Bookkeeping has no await points, so it is atomic on the event loop.
+        to_close = self._evict_idle()
+
+        entry = self._entries.get(key)
+        if entry is not None:
+            self.hits += 1
+            self._entries.move_to_end(key)
+        else:
+            self.misses += 1
+            entry = _PooledClient(AsyncOpenAI(api_key=api_key))
+            self._entries[key] = entry
+            while len(self._entries) > self.max_size:
+                to_close += self._evict(next(iter(self._entries)))
+
+        entry.in_use += 1
+        await self._close(to_close)
+
+        try:
+            yield entry.client
+        finally:
+            entry.in_use -= 1
+            entry.last_used = time.monotonic()
+            if entry.evicted and entry.in_use == 0:
+                await self._close([entry.client])
+
+    async def aclose(self):
+        """Close every idle pooled client. Called on application shutdown."""
+        to_close = []
+        for key in list(self._entries):
+            to_close += self._evict(key)
+        await self._close(to_close)
+
+    def stats(self) -> dict:
+        """Return pool size and hit/miss/eviction counters."""
+        return {
+            "size": len(self._entries),
+            "max_size": self.max_size,
+            "hits": self.hits,
+            "misses": self.misses,
+            "evictions": self.evictions,
+        }
+
+
+openai_pool = OpenAIClientPool()
+
+
+class ClientRegistry:
+    """
+    Lazily constructed, process-wide clients shared by the tools.
+
+    Modules register a factory under a name at import time; the client is
+    only built (once, thread-safely) the first time it is requested, so
+    importing the agent does not open connections or require credentials for
+    tools that are never used. ``warmup`` builds clients ahead of the first
+    request and records failures for the readiness check.
+    """
+
+    def __init__(self):
+        self._factories = {}
+        self._warmup = []
+        self._clients = {}
+        self._errors = {}
+        self._lock = threading.Lock()
+        self.warmed_up = False
+
+    def register(self, name: str, factory, warmup: bool = True):
+        """
+        Register the factory that builds client ``name``.
+
+        Args:
+            name (str): Registry name, e.g. ``openai`` or ``tavily``.
+            factory (Callable[[], Any]): Builds the client; may raise if it is not configured.
+            warmup (bool): Build it in the default warmup. Clients that are only
+                used by some configurations (or by offline scripts) pass False.
+        """
+        self._factories[name] = factory
+        if warmup and name not in self._warmup:
+            self._warmup.append(name)
+
+    def get(self, name: str):
+        """Return client ``name``, building it on first use."""
+        client = self._clients.get(name)
+        if client is not None:
+            return client
+
+        with self._lock:
+            if name not in self._clients:
+                try:
+                    self._clients[name] = self._factories[name]()
+                    self._errors.pop(name, None)
+                except Exception as e:
+                    self._errors[name] = str(e)
+                    raise
+            return self._clients[name]
+
+    def warmup(self, names=None) -> dict:
+        """
+        Build clients ahead of the first request.
+
+        Args:
+            names (List[str], optional): Clients to build; defaults to CLIENT_WARMUP
+                (comma separated) or every client registered with ``warmup=True``.
+
+        Returns:
+            dict: Readiness per client, see ``status``.
+        """
+        if names is None:
+            names = [n.strip() for n in CLIENT_WARMUP.split(",") if n.strip()] if CLIENT_WARMUP else list(self._warmup)
+
+        for name in names:
+            start = time.perf_counter()
+            try:
+                self.get(name)
+                logger.info(f"Client '{name}' ready in {time.perf_counter() - start:.2f}s.")
+            except Exception as e:
+                logger.error(f"Failed to initialize client '{name}' : {e}")
+
+        self.warmed_up = True
+        return self.status()
+
+    def status(self) -> dict:
+        """Return ``ready``, ``error: ...`` or ``not_initialized`` for every registered client."""
+        return {
+            name: "ready" if name in self._clients else f"error: {self._errors[name]}" if name in self._errors else "not_initialized"
+            for name in self._factories
+        }
+
+
+def _openai_client():
+    from openai import OpenAI
+    return OpenAI()
+
+
+def _tavily_client():
+    from tavily import TavilyClient
+
+    api_key = os.getenv("TAVILY_API_KEY")
+    if not api_key:
+        raise ValueError("TAVILY_API_KEY enviorment varaible not set.")
+    return TavilyClient(api_key)
+
+
+clients = ClientRegistry()
+clients.register("openai", _openai_client)
+clients.register("tavily", _tavily_client)
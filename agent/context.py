@@ -0,0 +1,241 @@
+import os
+import json
+import logging
+import threading
+from typing import List, Tuple
+from collections import OrderedDict
+
+from dotenv import load_dotenv
+from langchain_core.messages import BaseMessage, SystemMessage, ToolMessage
+
+from agent.tools.postprocess import estimate_tokens
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+CONTEXT_TOKEN_BUDGET = int(os.getenv("CONTEXT_TOKEN_BUDGET", 24000))
+CONTEXT_RECENT_TURNS = int(os.getenv("CONTEXT_RECENT_TURNS", 2))
+CONTEXT_SUMMARY_TARGET = float(os.getenv("CONTEXT_SUMMARY_TARGET", 0.6))
+CONTEXT_SUMMARY_MODEL = os.getenv("CONTEXT_SUMMARY_MODEL", "gpt-4o-mini-2024-07-18")
+CONTEXT_SUMMARY_MAX_TOKENS = int(os.getenv("CONTEXT_SUMMARY_MAX_TOKENS", 800))
+CONTEXT_TOKEN_CACHE_SIZE = int(os.getenv("CONTEXT_TOKEN_CACHE_SIZE", 20000))
+SUMMARY_INPUT_TOOL_CHARS = 1500
+
+SUMMARY_PROMPT = """You maintain the running summary of a conversation between a venture capital analyst assistant and its user.
+Update the summary with the new messages. Keep every company name, founder, metric, score, recommendation, decision, URL and open question; drop pleasantries and raw tool output that is not needed later.
+Reply with the updated summary only, as concise bullet points."""
+
+_token_counts = OrderedDict()
+_token_lock = threading.Lock()
+
+
+def message_tokens(msg: BaseMessage) -> int:
+    """Estimate the prompt tokens of one message, memoized by message id."""
+    key = (msg.id, len(str(msg.content))) if msg.id else None
+    if key is not None:
+        with _token_lock:
+            count = _token_counts.get(key)
+            if count is not None:
+                _token_counts.move_to_end(key)
+                return count
+
+    count = estimate_tokens(str(msg.content)) + 4
+    for call in getattr(msg, "tool_calls", None) or []:
+        count += estimate_tokens(call["name"] + json.dumps(call["args"]))
+
+    if key is not None:
+        with _token_lock:
+            _token_counts[key] = count
+            while len(_token_counts) > CONTEXT_TOKEN_CACHE_SIZE:
+                _token_counts.popitem(last=False)
+    return count
+
+
+def turn_starts(messages: List[BaseMessage]) -> List[int]:
+    """Indices of the user messages that open each turn."""
+    return [i for i, msg in enumerate(messages) if msg.type == "human"]
+
+
+def stub_tool_output(msg: ToolMessage, tool_names: dict) -> ToolMessage:
+    """Replace a stale tool output with a short placeholder that still answers its tool call."""
+    name = tool_names.get(msg.tool_call_id, "tool")
+    return ToolMessage(
+        content=f"[{name} result from an earlier turn omitted ({message_tokens(msg)} tokens). Call the tool again if you need it.]",
+        tool_call_id=msg.tool_call_id,
+        response_metadata={"stub": True},
+    )
+
+
+def verbatim_tool_calls(messages: List[BaseMessage]) -> set:
+    """Ids of the tool calls whose output is sent in full (not stubbed) in ``messages``."""
+    return {
+        msg.tool_call_id for msg in messages
+        if msg.type == "tool" and not msg.response_metadata.get("stub")
+    }
+
+
+def stub_recent_outputs(recent: List[BaseMessage], current_start: int, limit: float) -> List[BaseMessage]:
+    """
+    Stub tool outputs in ``recent[:current_start]``, largest first, until
+    ``recent`` fits in ``limit`` tokens. The current turn is never touched.
+    """
+    tool_names = {
+        call["id"]: call["name"]
+        for m in recent if m.type == "ai"
+        for call in m.tool_calls or []
+    }
+    recent = list(recent)
+    total = sum(message_tokens(m) for m in recent)
+    candidates = sorted(
+        (i for i in range(current_start) if recent[i].type == "tool"),
+        key=lambda i: message_tokens(recent[i]),
+        reverse=True,
+    )
+    for i in candidates:
+        if total <= limit:
+            break
+        stub = stub_tool_output(recent[i], tool_names)
+        total -= message_tokens(recent[i]) - message_tokens(stub)
+        recent[i] = stub
+    return recent
+
+
+def render_for_summary(messages: List[BaseMessage]) -> str:
+    """Render messages as plain text for the summarizer, truncating tool output."""
+    lines = []
+    for msg in messages:
+        content = str(msg.content)
+        if msg.type == "tool":
+            content = content[:SUMMARY_INPUT_TOOL_CHARS]
+        for call in getattr(msg, "tool_calls", None) or []:
+            content += f"\n[called {call['name']} with {json.dumps(call['args'])}]"
+        lines.append(f"{msg.type.upper()}: {content}")
+    return "\n\n".join(lines)
+
+
+async def summarize(client, summary: str, messages: List[BaseMessage]) -> str:
+    """
+    Fold ``messages`` into the running ``summary`` with one LLM call.
+
+    Args:
+        client (AsyncOpenAI): Client used for the request.
+        summary (str): The current summary ("" if none yet).
+        messages (List[BaseMessage]): Whole turns being folded into the summary.
+
+    Returns:
+        str: The updated summary.
+    """
+    completion = await client.chat.completions.create(
+        model=CONTEXT_SUMMARY_MODEL,
+        max_tokens=CONTEXT_SUMMARY_MAX_TOKENS,
+        messages=[
+            {"role": "system", "content": SUMMARY_PROMPT},
+            {"role": "user", "content": f"Current summary:\n{summary or '(none)'}\n\nNew messages:\n{render_for_summary(messages)}"},
+        ],
+    )
+    return completion.choices[0].message.content or summary
+
+
+async def build_context(
+    messages: List[BaseMessage],
+    summary: str,
+    summarized_count: int,
+    client,
+    budget: int = CONTEXT_TOKEN_BUDGET,
+) -> Tuple[List[BaseMessage], dict]:
+    """
+    Fit the conversation history into ``budget`` tokens.
+
+    Steps, each applied only while the history is still over budget:
+
+    1. Tool outputs in turns older than the last CONTEXT_RECENT_TURNS are
+       replaced by short stubs.
+    2. If the summary and recent turns alone do not fit under
+       CONTEXT_SUMMARY_TARGET of the budget, folding cannot help, so tool
+       outputs in the recent turns are stubbed too, largest first. The
+       current turn is always kept verbatim.
+    3. The oldest turns are folded into the rolling summary until the
+       history is under CONTEXT_SUMMARY_TARGET of the budget, so the next
+       few turns fit without summarizing again. Only the newly folded turns
+       are sent to the summarizer together with the previous summary.
+
+    Stubbed messages are marked with ``response_metadata["stub"]``; see
+    verbatim_tool_calls.
+
+    The summary always covers whole turns: ``summarized_count`` is the index
+    of the first message that is not summarized and is always a turn start.
+
+    Args:
+        messages (List[BaseMessage]): Full history, including this turn's tool results.
+        summary (str): Rolling summary stored in the session state.
+        summarized_count (int): Number of leading messages covered by ``summary``.
+        client (AsyncOpenAI): Client used for summarization.
+        budget (int): Token budget for the history.
+
+    Returns:
+        tuple: (messages to send, state updates for context_summary / summarized_count)
+    """
+    updates = {}
+    if summarized_count > len(messages):
+        summary, summarized_count = "", 0
+        updates = {"context_summary": "", "summarized_count": 0}
+
+    starts = turn_starts(messages)
+    recent_start = starts[-CONTEXT_RECENT_TURNS] if len(starts) >= CONTEXT_RECENT_TURNS else 0
+    recent_start = max(recent_start, summarized_count)
+
+    target = budget * CONTEXT_SUMMARY_TARGET
+    current_start = max(starts[-1] if starts else 0, recent_start) - recent_start
+
+    def assemble(summary, first):
+        older = messages[first:recent_start]
+        recent = messages[recent_start:]
+        if sum(message_tokens(m) for m in older) + sum(message_tokens(m) for m in recent) > budget:
+            tool_names = {
+                call["id"]: call["name"]
+                for m in older if m.type == "ai"
+                for call in m.tool_calls or []
+            }
+            older = [stub_tool_output(m, tool_names) if m.type == "tool" else m for m in older]
+
+        header = [SystemMessage(content="Summary of the earlier conversation:\n" + summary)] if summary else []
+        fixed = sum(message_tokens(m) for m in header + recent)
+        if fixed + sum(message_tokens(m) for m in older) > budget and fixed > target:
+            header_tokens = sum(message_tokens(m) for m in header)
+            recent = stub_recent_outputs(recent, current_start, target - header_tokens)
+        return header, older, recent
+
+    header, older, recent = assemble(summary, summarized_count)
+    context = header + older + recent
+    total = sum(message_tokens(m) for m in context)
+    if total <= budget:
+        return context, updates
+
+    # Fold the oldest unsummarized turns until the history drops below the target.
+    older_tokens = [message_tokens(m) for m in older]
+    fold_to = summarized_count
+    remaining = total
+    for start in starts:
+        if start <= summarized_count or start > recent_start:
+            continue
+        if remaining <= target:
+            break
+        remaining -= sum(older_tokens[fold_to - summarized_count:start - summarized_count])
+        fold_to = start
+
+    # When the current turn alone is over budget, folding cannot fit the
+    # history; only summarize once enough older turns piled up to be worth a call.
+    if fold_to == summarized_count or (remaining > budget and total - remaining < budget - target):
+        logger.warning(f"History is {total} tokens (budget {budget}), most of it in the current turn.")
+        return context, updates
+
+    try:
+        summary = await summarize(client, summary, messages[summarized_count:fold_to])
+    except Exception as e:
+        logger.warning(f"Context summarization failed, sending stubbed history instead : {e}")
+        return context, updates
+
+    logger.info(f"Summarized messages {summarized_count}-{fold_to} into the rolling summary ({total} tokens over budget {budget}).")
+    header, older, recent = assemble(summary, fold_to)
+    return header + older + recent, {"context_summary": summary, "summarized_count": fold_to}
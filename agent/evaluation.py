@@ -0,0 +1,251 @@
+"""
+Deterministic pitch evaluation.
+
+Instead of letting the model pick tools turn by turn, ``mode="evaluate"``
+runs a fixed plan: one wave of parallel tool calls (web_search for the
+company and its market, rag_retrieve for the fund thesis, web_scrap for the
+URLs in the pitch), then a single structured-output completion that fills
+the rubric from agent/prompt.py. Totals, hard filters and the recommendation
+are computed here rather than by the model.
+"""
+import os
+import re
+import json
+import logging
+from typing import List, Optional
+
+from dotenv import load_dotenv
+
+from agent.tools.web_search import compact_search_results
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+EVALUATION_MAX_URLS = int(os.getenv("EVALUATION_MAX_URLS", 5))
+EVALUATION_SOURCE_CHARS = int(os.getenv("EVALUATION_SOURCE_CHARS", 6000))
+
+# Rubric dimension -> (title, maximum points), as in the system prompt.
+RUBRIC = {
+    "sector_alignment": ("Sector Alignment", 20),
+    "financial_strength": ("Financial Strength", 20),
+    "customer_metrics": ("Customer & Retention Metrics", 15),
+    "team_strength": ("Team Strength", 15),
+    "market_soundness": ("Market & Business Model", 15),
+    "soft_criteria": ("Soft Criteria", 15),
+}
+
+HARD_FILTERS = {
+    "pre_revenue": "Pre-revenue",
+    "tam_below_800m": "TAM < $800M",
+    "ltv_cac_below_2": "LTV/CAC < 2",
+    "fintech_without_license": "FinTech lacking regulatory licenses",
+    "no_path_to_profitability": "No path to profitability",
+}
+
+EVALUATION_PROMPT = """You are a venture capital analyst scoring a startup pitch against a fixed rubric.
+Use only the pitch and the evidence provided; do NOT hallucinate metrics. If the pitch lacks information on a criterion, say so in the explanation and score low.
+The fund documents (rag_retrieve) are the authoritative source for the investment thesis and scoring policy.
+
+Maximum points: sector_alignment 20, financial_strength 20, customer_metrics 15, team_strength 15, market_soundness 15, soft_criteria 15 (clarity, narrative, differentiation).
+Scoring interpretation: 0-4 very weak or missing, 5-10 partially aligned / incomplete, 11-15 strong, 16-20 excellent (for categories that go up to 20).
+
+Mark a hard filter as failed only when the pitch or the evidence shows it: pre-revenue, TAM below $800M, LTV/CAC below 2, a FinTech lacking regulatory licenses, or no path to profitability.
+Keep explanations professional, objective and investment-focused."""
+
+class EvaluationError(RuntimeError):
+    """The model did not return a usable structured evaluation (refusal, empty or truncated output)."""
+
+
+_URL = re.compile(r"https?://[^\s)>\]\"']+")
+_COMPANY_LINE = re.compile(r"^\s*(?:company(?: name)?|startup)\s*[:\-]\s*(.+)$", re.IGNORECASE | re.MULTILINE)
+_MARKET_LINE = re.compile(r"^\s*(?:market|sector|industry)\s*[:\-]\s*(.+)$", re.IGNORECASE | re.MULTILINE)
+
+
+def evaluation_schema() -> dict:
+    """JSON schema for the structured-output completion."""
+    dimension = {
+        "type": "object",
+        "properties": {"explanation": {"type": "string"}, "score": {"type": "integer"}},
+        "required": ["explanation", "score"],
+        "additionalProperties": False,
+    }
+    hard_filters = {
+        "type": "object",
+        "properties": {name: {"type": "boolean"} for name in HARD_FILTERS},
+        "required": list(HARD_FILTERS),
+        "additionalProperties": False,
+    }
+    properties = {name: dimension for name in RUBRIC}
+    properties.update({"hard_filters": hard_filters, "hard_filter_notes": {"type": "string"}})
+    return {
+        "type": "object",
+        "properties": properties,
+        "required": list(properties),
+        "additionalProperties": False,
+    }
+
+
+def plan_evaluation(pitch: str, company: Optional[str] = None, market: Optional[str] = None) -> List[dict]:
+    """
+    Build the fixed tool plan for a pitch, in the tool_call_plan format.
+
+    The company and market come from the request when given, else from
+    ``Company:`` / ``Market:`` lines in the pitch, else from its first line.
+
+    Args:
+        pitch (str): The pitch text.
+        company (str, optional): Company name.
+        market (str, optional): Market or sector.
+
+    Returns:
+        List[dict]: Tool calls to run in parallel.
+    """
+    first_line = next((line.strip() for line in pitch.splitlines() if line.strip()), pitch)[:120]
+    match = _COMPANY_LINE.search(pitch)
+    company = company or (match.group(1).strip() if match else first_line)
+    match = _MARKET_LINE.search(pitch)
+    market = market or (match.group(1).strip() if match else None)
+
+    plan = [
+        ("web_search", {"query": f"{company} startup funding team customers"}),
+        ("web_search", {"query": f"{market or company} market size growth competitors"}),
+        ("rag_retrieve", {"user_query": f"fund investment thesis and evaluation criteria for {market or company}"}),
+    ]
+
+    urls = list(dict.fromkeys(url.rstrip(".,;") for url in _URL.findall(pitch)))[:EVALUATION_MAX_URLS]
+    if urls:
+        plan.append(("web_scrap", {"urls": urls}))
+
+    return [
+        {"tool_call_id": f"evaluation-{i}", "params": {"name": name, "arguments": args}}
+        for i, (name, args) in enumerate(plan)
+    ]
+
+
+def build_evidence(plan: List[dict], results: list) -> str:
+    """Render the tool results as the evidence block, each source capped at EVALUATION_SOURCE_CHARS."""
+    sections = []
+    seen = set()
+
+    for call, result in zip(plan, results):
+        name = call["params"]["name"]
+        if name == "web_search":
+            result, _ = compact_search_results(result, seen)
+        content = result if isinstance(result, str) else json.dumps(result)
+        sections.append(f"### {name} {json.dumps(call['params']['arguments'])}\n{content[:EVALUATION_SOURCE_CHARS]}")
+
+    return "\n\n".join(sections)
+
+
+def recommend(total: int, failures: List[str]) -> str:
+    """Apply the recommendation thresholds from the system prompt."""
+    if failures:
+        return "Reject – Hard Filter Failure"
+    if total >= 75:
+        return "Schedule Intro Call"
+    if total >= 60:
+        return "Internal Review Recommended"
+    return "Reject"
+
+
+def score_evaluation(structured: dict) -> dict:
+    """
+    Clamp the model's scores to the rubric and compute the total and recommendation.
+
+    Args:
+        structured (dict): Parsed structured-output completion.
+
+    Returns:
+        dict: ``dimensions``, ``hard_filter_failures``, ``hard_filter_notes``,
+        ``total_score`` and ``recommendation``.
+    """
+    dimensions = {}
+    for name, (title, max_points) in RUBRIC.items():
+        entry = structured.get(name) or {}
+        score = min(max(int(entry.get("score") or 0), 0), max_points)
+        dimensions[name] = {"title": title, "score": score, "max_score": max_points, "explanation": entry.get("explanation", "")}
+
+    failed = structured.get("hard_filters") or {}
+    failures = [label for name, label in HARD_FILTERS.items() if failed.get(name)]
+    total = sum(d["score"] for d in dimensions.values())
+
+    return {
+        "dimensions": dimensions,
+        "hard_filter_failures": failures,
+        "hard_filter_notes": structured.get("hard_filter_notes", ""),
+        "total_score": total,
+        "recommendation": recommend(total, failures),
+    }
+
+
+def format_evaluation(scored: dict) -> str:
+    """Render a scored evaluation in the text format the system prompt prescribes."""
+    lines = []
+    for i, d in enumerate(scored["dimensions"].values(), start=1):
+        lines += [
+            f"{i}. **{d['title']} (0–{d['max_score']}):**",
+            f"   - {d['explanation']}",
+            f"   - Score: {d['score']}/{d['max_score']}",
+            "",
+        ]
+
+    failures = ", ".join(scored["hard_filter_failures"]) or "None"
+    notes = f" ({scored['hard_filter_notes']})" if scored["hard_filter_notes"] and scored["hard_filter_failures"] else ""
+    lines += [
+        "7. **Hard Filter Evaluation:**",
+        f"   - {failures}{notes}",
+        "",
+        "8. **Total Score:**",
+        f"   **Total Score: {scored['total_score']}/100**",
+        "",
+        "9. **Final Recommendation:**",
+        f"   {scored['recommendation']}",
+    ]
+    return "\n".join(lines)
+
+
+async def evaluate_pitch(client, model: str, pitch: str, evidence: str) -> tuple:
+    """
+    Fill the rubric with a single structured-output completion.
+
+    Args:
+        client (AsyncOpenAI): Client used for the request.
+        model (str): Chat model.
+        pitch (str): The pitch text.
+        evidence (str): Rendered tool results, see build_evidence.
+
+    Returns:
+        tuple: (scored evaluation, completion usage)
+
+    Raises:
+        EvaluationError: If the model refused, returned nothing, or its output
+            was cut off or is not valid JSON. No score is made up in that case.
+    """
+    completion = await client.chat.completions.create(
+        model=model,
+        messages=[
+            {"role": "system", "content": EVALUATION_PROMPT},
+            {"role": "user", "content": f"PITCH:\n{pitch}\n\nEVIDENCE:\n{evidence}"},
+        ],
+        response_format={
+            "type": "json_schema",
+            "json_schema": {"name": "pitch_evaluation", "strict": True, "schema": evaluation_schema()},
+        },
+    )
+
+    choice = completion.choices[0]
+    message = choice.message
+    if getattr(message, "refusal", None):
+        raise EvaluationError(f"The model refused to evaluate the pitch: {message.refusal}")
+    if not message.content:
+        raise EvaluationError(f"The model returned no evaluation (finish_reason={choice.finish_reason}).")
+    if choice.finish_reason in ("length", "content_filter"):
+        raise EvaluationError(f"The evaluation was cut off (finish_reason={choice.finish_reason}).")
+
+    try:
+        structured = json.loads(message.content)
+    except json.JSONDecodeError as e:
+        raise EvaluationError(f"The evaluation is not valid JSON: {e}") from e
+
+    return score_evaluation(structured), completion.usage
@@ -0,0 +1,405 @@
+"""
+Bulk ingestion of documents into the vc_docs knowledge base.
+
+Streams text documents from a directory, chunks them, embeds the chunks in
+large batches under rate-limit-aware concurrency and upserts them into the
+configured vector backend (Cosmos DB or the local index). A manifest records
+the content hash of every chunk that has been written, so an interrupted run
+resumes where it stopped and re-ingesting an unchanged corpus embeds nothing.
+Written chunks are also added to the BM25 keyword index used by the hybrid
+retriever; ``--reindex-keywords`` rebuilds it for unchanged chunks too.
+
+Chunks the manifest holds for a document that now has fewer chunks, or for a
+document that is no longer under ``root`` (unless ``--keep-missing``), are
+deleted from the backend, the keyword index and the manifest.
+
+With the local backend the IVF prefilter is (re)built at the end of the run
+when ``--build-ivf`` is given, or automatically when the index reached
+LOCAL_INDEX_IVF_MIN_ROWS rows or doubled in size since the last build.
+
+Usage:
+    python -m agent.ingest ./docs --backend local --batch-size 256 --concurrency 4
+"""
+import os
+import time
+import random
+import sqlite3
+import hashlib
+import logging
+import argparse
+import threading
+from typing import Iterator, List
+from concurrent.futures import ThreadPoolExecutor, wait, FIRST_COMPLETED
+
+import numpy as np
+from openai import RateLimitError, APITimeoutError, APIConnectionError
+
+logger = logging.getLogger(__name__)
+
+DOCUMENT_EXTENSIONS = (".txt", ".md", ".markdown", ".rst")
+
+
+def iter_documents(root: str) -> Iterator[tuple]:
+    """
+    Yield ``(relative_path, text)`` for every supported document under ``root``.
+
+    Files are read one at a time so the corpus never has to fit in memory.
+    """
+    for dirpath, _, filenames in os.walk(root):
+        for filename in sorted(filenames):
+            if not filename.lower().endswith(DOCUMENT_EXTENSIONS):
+                continue
+            path = os.path.join(dirpath, filename)
+            with open(path, encoding="utf-8", errors="ignore") as f:
+                yield os.path.relpath(path, root), f.read()
+
+
+def chunk_text(text: str, chunk_words: int = 300, overlap_words: int = 50) -> List[str]:
+    """
+    Split ``text`` into overlapping windows of roughly ``chunk_words`` words.
+
+    Args:
+        text (str): Document text.
+        chunk_words (int): Words per chunk.
+        overlap_words (int): Words shared by consecutive chunks.
+
+    Returns:
+        List[str]: The chunks, in document order.
+    """
+    words = text.split()
+    if not words:
+        return []
+
+    step = max(1, chunk_words - overlap_words)
+    return [
+        " ".join(words[start:start + chunk_words])
+        for start in range(0, max(len(words) - overlap_words, 1), step)
+    ]
+
+
+def content_hash(text: str) -> str:
+    return hashlib.sha256(text.encode()).hexdigest()
+
+
+class Manifest:
+    """SQLite record of the content hash last written for each chunk id."""
+
+    def __init__(self, path: str):
+        self._conn = sqlite3.connect(path, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("CREATE TABLE IF NOT EXISTS chunks (id TEXT PRIMARY KEY, source TEXT, hash TEXT)")
+        self._conn.execute("CREATE INDEX IF NOT EXISTS chunks_source ON chunks (source)")
+        self._conn.commit()
+        self._lock = threading.Lock()
+
+    def unchanged(self, chunk_id: str, digest: str) -> bool:
+        with self._lock:
+            row = self._conn.execute("SELECT hash FROM chunks WHERE id = ?", (chunk_id,)).fetchone()
+        return row is not None and row[0] == digest
+
+    def record(self, chunks: List[dict]):
+        with self._lock:
+            self._conn.executemany(
+                "INSERT OR REPLACE INTO chunks (id, source, hash) VALUES (?, ?, ?)",
+                [(c["id"], c["metadata"]["source"], c["hash"]) for c in chunks],
+            )
+            self._conn.commit()
+
+    def chunk_ids(self, source: str) -> List[str]:
+        with self._lock:
+            return [row[0] for row in self._conn.execute("SELECT id FROM chunks WHERE source = ?", (source,))]
+
+    def sources(self) -> set:
+        with self._lock:
+            return {row[0] for row in self._conn.execute("SELECT DISTINCT source FROM chunks")}
+
+    def forget(self, chunk_ids: List[str]):
+        with self._lock:
+            self._conn.executemany("DELETE FROM chunks WHERE id = ?", [(i,) for i in chunk_ids])
+            self._conn.commit()
+
+
+class RateLimitGate:
+    """
+    Shared back-off for all embedding workers.
+
+    When any worker is rate limited, every worker waits until the cool-down
+    has passed, instead of each one retrying on its own and getting rate
+    limited again.
+    """
+
+    def __init__(self):
+        self._resume_at = 0.0
+        self._lock = threading.Lock()
+
+    def wait(self):
+        delay = self._resume_at - time.monotonic()
+        if delay > 0:
+            time.sleep(delay)
+
+    def back_off(self, seconds: float):
+        with self._lock:
+            self._resume_at = max(self._resume_at, time.monotonic() + seconds)
+
+
+def embed_with_retry(client, texts: List[str], model: str, gate: RateLimitGate, max_retries: int = 8) -> np.ndarray:
+    """Embed one batch, backing off exponentially (with jitter) on rate limits and transient errors."""
+    for attempt in range(max_retries):
+        gate.wait()
+        try:
+            response = client.embeddings.create(input=texts, model=model)
+            return np.asarray(
+                [item.embedding for item in sorted(response.data, key=lambda d: d.index)],
+                dtype=np.float32,
+            )
+        except (RateLimitError, APITimeoutError, APIConnectionError) as e:
+            delay = min(60.0, 2 ** attempt) * (0.5 + random.random())
+            logger.warning(f"Embedding batch failed ({type(e).__name__}); backing off {delay:.1f}s.")
+            gate.back_off(delay)
+
+    raise RuntimeError(f"Embedding batch failed after {max_retries} retries.")
+
+
+def cosmos_writer(upsert_concurrency: int = 16):
+    """Return a writer that upserts chunks into the Cosmos container used by the retriever."""
+    from agent.clients import clients
+
+    container = clients.get("cosmos")
+
+    pool = ThreadPoolExecutor(max_workers=upsert_concurrency)
+
+    def write(chunks: List[dict], embeddings: np.ndarray):
+        items = [
+            {"id": c["id"], "text": c["text"], "metadata": c["metadata"], "embedding": e.tolist()}
+            for c, e in zip(chunks, embeddings)
+        ]
+        list(pool.map(container.upsert_item, items))
+
+    return write
+
+
+def cosmos_deleter():
+    """Return a function that deletes chunks by id from the Cosmos container."""
+    from agent.clients import clients
+
+    container = clients.get("cosmos")
+    # delete_item needs each item's partition key value; read it through the container's key path.
+    path = container.read()["partitionKey"]["paths"][0].strip("/").split("/")
+    partition_key = "c" + "".join(f'["{part}"]' for part in path)
+
+    def delete(ids: List[str]):
+        items = container.query_items(
+            query=f"SELECT c.id, {partition_key} AS pk FROM c WHERE ARRAY_CONTAINS(@ids, c.id)",
+            parameters=[{"name": "@ids", "value": list(ids)}],
+            enable_cross_partition_query=True,
+        )
+        for item in items:
+            container.delete_item(item=item["id"], partition_key=item.get("pk"))
+
+    return delete
+
+
+def local_writer():
+    """Return a writer that upserts chunks into the local memory-mapped index."""
+    from agent.tools.local_index import get_local_index
+
+    index = get_local_index()
+
+    def write(chunks: List[dict], embeddings: np.ndarray):
+        index.add(chunks, embeddings)
+
+    return write
+
+
+def local_deleter():
+    """Return a function that deletes chunks by id from the local index."""
+    from agent.tools.local_index import get_local_index
+
+    return get_local_index().delete
+
+
+def ingest(
+    root: str,
+    backend: str = "cosmos",
+    manifest_path: str = "ingest_manifest.sqlite",
+    batch_size: int = 256,
+    concurrency: int = 4,
+    chunk_words: int = 300,
+    overlap_words: int = 50,
+    keyword_index: bool = True,
+    reindex_keywords: bool = False,
+    prune_missing: bool = True,
+    build_ivf: bool = False,
+) -> dict:
+    """
+    Ingest every document under ``root`` into ``backend``.
+
+    Args:
+        root (str): Directory to read documents from.
+        backend (str): ``cosmos`` or ``local``.
+        manifest_path (str): SQLite manifest used for resume and change detection.
+        batch_size (int): Chunks per embeddings request.
+        concurrency (int): Embedding/upsert batches in flight.
+        chunk_words (int): Words per chunk.
+        overlap_words (int): Words shared by consecutive chunks.
+        keyword_index (bool): Also add written chunks to the keyword index.
+        reindex_keywords (bool): Add unchanged (skipped) chunks to the keyword index as well.
+        prune_missing (bool): Delete the chunks of manifest documents that are no longer under ``root``.
+        build_ivf (bool): Rebuild the local index's IVF prefilter even if it is not due.
+
+    Returns:
+        dict: Counters and throughput for the run.
+    """
+    from agent.clients import clients
+    from agent.tools.retriever import EMBEDDINGS_MODEL
+    from agent.tools.keyword_index import get_keyword_index
+
+    write, delete = (cosmos_writer(), cosmos_deleter()) if backend == "cosmos" else (local_writer(), local_deleter())
+    keywords = get_keyword_index() if keyword_index else None
+    # Stale chunks are removed from an existing keyword index even when it is not updated.
+    stale_keywords = keywords or get_keyword_index(create=False)
+    reindex = []
+    stale = []
+    seen_sources = set()
+    manifest = Manifest(manifest_path)
+    gate = RateLimitGate()
+    openai_client = clients.get("openai")
+    stats = {"documents": 0, "chunks": 0, "skipped": 0, "embedded": 0, "deleted": 0, "ivf_built": False}
+
+    def process(batch: List[dict]):
+        embeddings = embed_with_retry(openai_client, [c["text"] for c in batch], EMBEDDINGS_MODEL, gate)
+        write(batch, embeddings)
+        if keywords is not None:
+            keywords.add([(c["id"], c["text"]) for c in batch])
+        manifest.record(batch)
+        return len(batch)
+
+    def remove(chunk_ids: List[str]):
+        # Manifest last, so ids whose deletion failed are retried by the next run.
+        delete(chunk_ids)
+        if stale_keywords is not None:
+            stale_keywords.delete(chunk_ids)
+        manifest.forget(chunk_ids)
+        stats["deleted"] += len(chunk_ids)
+
+    start = time.perf_counter()
+    pending = set()
+    batch = []
+
+    with ThreadPoolExecutor(max_workers=concurrency) as pool:
+        def submit(chunks):
+            # Keep at most two batches per worker queued so the corpus is streamed, not buffered.
+            while len(pending) >= concurrency * 2:
+                done, _ = wait(pending, return_when=FIRST_COMPLETED)
+                for future in done:
+                    pending.discard(future)
+                    stats["embedded"] += future.result()
+            pending.add(pool.submit(process, chunks))
+
+        for source, text in iter_documents(root):
+            stats["documents"] += 1
+            seen_sources.add(source)
+            source_id = hashlib.sha1(source.encode()).hexdigest()[:16]
+            chunks = chunk_text(text, chunk_words, overlap_words)
+
+            current = {f"{source_id}-{i}" for i in range(len(chunks))}
+            stale += [chunk_id for chunk_id in manifest.chunk_ids(source) if chunk_id not in current]
+            if len(stale) >= batch_size:
+                remove(stale)
+                stale = []
+
+            for i, chunk in enumerate(chunks):
+                stats["chunks"] += 1
+                chunk_id = f"{source_id}-{i}"
+                digest = content_hash(chunk)
+
+                if manifest.unchanged(chunk_id, digest):
+                    stats["skipped"] += 1
+                    if keywords is not None and reindex_keywords:
+                        reindex.append((chunk_id, chunk))
+                        if len(reindex) >= batch_size:
+                            keywords.add(reindex)
+                            reindex = []
+                    continue
+
+                batch.append({
+                    "id": chunk_id,
+                    "text": chunk,
+                    "hash": digest,
+                    "metadata": {"source": source, "chunk": i},
+                })
+                if len(batch) >= batch_size:
+                    submit(batch)
+                    batch = []
+
+            if stats["documents"] % 100 == 0:
+                elapsed = time.perf_counter() - start
+                logger.info(f"{stats['documents']} documents ({stats['documents'] / elapsed:.1f} docs/s), {stats['skipped']} unchanged chunks skipped.")
+
+        if batch:
+            submit(batch)
+        if reindex:
+            keywords.add(reindex)
+        if prune_missing:
+            for source in manifest.sources() - seen_sources:
+                stale += manifest.chunk_ids(source)
+        for start_at in range(0, len(stale), batch_size):
+            remove(stale[start_at:start_at + batch_size])
+        for future in pending:
+            stats["embedded"] += future.result()
+
+    if backend == "local":
+        from agent.tools.local_index import get_local_index
+
+        index = get_local_index()
+        if build_ivf or index.needs_ivf():
+            index.build_ivf()
+            stats["ivf_built"] = True
+
+    elapsed = time.perf_counter() - start
+    stats.update({
+        "elapsed": elapsed,
+        "docs_per_second": stats["documents"] / elapsed if elapsed else 0.0,
+        "chunks_per_second": stats["chunks"] / elapsed if elapsed else 0.0,
+    })
+    return stats
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("root", help="Directory containing the documents to ingest.")
+    parser.add_argument("--backend", choices=["cosmos", "local"], default=os.getenv("VECTOR_BACKEND", "cosmos"))
+    parser.add_argument("--manifest", default="ingest_manifest.sqlite")
+    parser.add_argument("--batch-size", type=int, default=256)
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--chunk-words", type=int, default=300)
+    parser.add_argument("--overlap-words", type=int, default=50)
+    parser.add_argument("--no-keyword-index", action="store_true", help="Do not update the BM25 keyword index.")
+    parser.add_argument("--reindex-keywords", action="store_true", help="Add unchanged chunks to the keyword index too.")
+    parser.add_argument("--keep-missing", action="store_true", help="Keep the chunks of documents no longer under root.")
+    parser.add_argument("--build-ivf", action="store_true", help="Rebuild the IVF prefilter of the local index.")
+    args = parser.parse_args()
+
+    logging.basicConfig(level=logging.INFO, format="%(asctime)s [%(levelname)s] %(name)s: %(message)s")
+
+    stats = ingest(
+        args.root,
+        backend=args.backend,
+        manifest_path=args.manifest,
+        batch_size=args.batch_size,
+        concurrency=args.concurrency,
+        chunk_words=args.chunk_words,
+        overlap_words=args.overlap_words,
+        keyword_index=not args.no_keyword_index,
+        reindex_keywords=args.reindex_keywords,
+        prune_missing=not args.keep_missing,
+        build_ivf=args.build_ivf,
+    )
+    logger.info(
+        f"Ingested {stats['documents']} documents / {stats['chunks']} chunks in {stats['elapsed']:.1f}s "
+        f"({stats['docs_per_second']:.1f} docs/s); embedded {stats['embedded']}, skipped {stats['skipped']} unchanged, deleted {stats['deleted']} stale."
+    )
+
+
+if __name__ == "__main__":
+    main()
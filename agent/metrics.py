@@ -0,0 +1,53 @@
+import threading
+
+
+class UsageStats:
+    """
+    Running totals of LLM token usage, including provider prompt-cache hits.
+
+    ``record`` takes the ``usage`` object of a chat completion (or of the
+    final chunk of a stream requested with ``include_usage``) and optionally
+    the call's latency.
+    """
+
+    def __init__(self):
+        self.requests = 0
+        self.prompt_tokens = 0
+        self.cached_tokens = 0
+        self.completion_tokens = 0
+        self.latency_total = 0.0
+        self.latency_max = 0.0
+        self._lock = threading.Lock()
+
+    @staticmethod
+    def cached_tokens_of(usage) -> int:
+        details = getattr(usage, "prompt_tokens_details", None)
+        return (getattr(details, "cached_tokens", None) or 0) if details else 0
+
+    def record(self, usage, latency: float = None):
+        if usage is None and latency is None:
+            return
+        with self._lock:
+            self.requests += 1
+            if usage is not None:
+                self.prompt_tokens += usage.prompt_tokens or 0
+                self.cached_tokens += self.cached_tokens_of(usage)
+                self.completion_tokens += usage.completion_tokens or 0
+            if latency is not None:
+                self.latency_total += latency
+                self.latency_max = max(self.latency_max, latency)
+
+    def stats(self) -> dict:
+        with self._lock:
+            return {
+                "requests": self.requests,
+                "prompt_tokens": self.prompt_tokens,
+                "cached_tokens": self.cached_tokens,
+                "completion_tokens": self.completion_tokens,
+                "cache_hit_rate": self.cached_tokens / self.prompt_tokens if self.prompt_tokens else 0.0,
+                "avg_latency": self.latency_total / self.requests if self.requests else 0.0,
+                "max_latency": self.latency_max,
+            }
+
+
+llm_usage = UsageStats()
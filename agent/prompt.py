@@ -15,11 +15,17 @@ rag_retrieve
 
    Retrieves relevant documents from the internal knowledge base using semantic search.
    Use this tool when the user asks for context, information stored in your internal documents, or knowledge that may not be available on the open web.
+   Narrow the search with filters (sector, fund, doc_type, date range) when you know them. For broad searches, request snippets_only and then read only the relevant documents with rag_fetch.
+
+rag_fetch
+
+   Fetches the full text of internal documents by id, after a snippets_only rag_retrieve.
 
 web_scrap
 
    Extracts detailed structured content from a specific webpage URL.
    Use this tool when the user gives a link and wants information directly from that exact page.
+   Pass all the pages you need from a site (home, pricing, team, blog) together in urls, in a single call.
 
 
 IMPORTANT RULE FOR EMAIL DRAFTING
@@ -0,0 +1,125 @@
+import os
+import re
+import logging
+from typing import List, Optional, Tuple
+
+from dotenv import load_dotenv
+
+from agent.metrics import UsageStats
+
+load_dotenv()
+
+logger = logging.getLogger(__name__)
+
+LLM_MODEL_PLANNER = os.getenv("LLM_MODEL_PLANNER", "gpt-4o-mini-2024-07-18")
+LLM_MODEL_FINAL = os.getenv("LLM_MODEL_FINAL", "gpt-4o-2024-08-06")
+
+# "tiered" applies the rules below; "planner" or "final" pins every call to one tier.
+LLM_ROUTING = os.getenv("LLM_ROUTING", "tiered")
+LONG_FORM_KEYWORDS = [
+    k.strip().lower()
+    for k in os.getenv(
+        "LONG_FORM_KEYWORDS",
+        "draft,email,report,memo,summarize,compare,recommendation",
+    ).split(",")
+    if k.strip()
+]
+LONG_FORM_MIN_CHARS = int(os.getenv("LONG_FORM_MIN_CHARS", 1500))
+ROUTE_AFTER_TOOLS = os.getenv("ROUTE_AFTER_TOOLS", "final")
+
+MODEL_TIERS = {
+    "planner": LLM_MODEL_PLANNER,
+    "final": LLM_MODEL_FINAL,
+}
+
+if LLM_ROUTING != "tiered" and LLM_ROUTING not in MODEL_TIERS:
+    raise ValueError(f"Unknown LLM_ROUTING: {LLM_ROUTING} (expected tiered, planner or final)")
+if ROUTE_AFTER_TOOLS not in MODEL_TIERS:
+    raise ValueError(f"Unknown ROUTE_AFTER_TOOLS: {ROUTE_AFTER_TOOLS} (expected planner or final)")
+
+_LONG_FORM = re.compile(r"\b(?:" + "|".join(re.escape(k) for k in LONG_FORM_KEYWORDS) + r")", re.IGNORECASE) if LONG_FORM_KEYWORDS else None
+
+tier_usage = {tier: UsageStats() for tier in MODEL_TIERS}
+route_counts = {}
+
+
+def is_long_form(text: str) -> bool:
+    """A request is long-form if it is long (e.g. a pasted pitch) or asks for a written deliverable."""
+    return len(text) >= LONG_FORM_MIN_CHARS or (_LONG_FORM is not None and _LONG_FORM.search(text) is not None)
+
+
+def route_turn(history: List) -> Tuple[str, str]:
+    """
+    Pick the model tier for a reasoning call.
+
+    Any call may still plan tool calls (e.g. a web_scrap after a
+    web_search), so it goes to the planner tier unless LLM_ROUTING pins
+    every call to one tier. When the answer belongs on a higher tier (see
+    route_answer), the planner call is stopped at its first answer token and
+    the answer is written on that tier.
+
+    Args:
+        history (List): LangChain messages of the session, this turn's tool results included.
+
+    Returns:
+        tuple: (tier, reason)
+    """
+    if LLM_ROUTING in MODEL_TIERS:
+        return LLM_ROUTING, "pinned by LLM_ROUTING"
+    return "planner", "tool planning / short reply"
+
+
+def route_answer(history: List, tier: str) -> Optional[Tuple[str, str]]:
+    """
+    Pick the tier that writes the answer if the call routed to ``tier``
+    starts answering instead of calling tools.
+
+    Rules, in order:
+        - LLM_ROUTING pins every call to one tier when it is not "tiered";
+        - an answer to this turn's tool results goes to ROUTE_AFTER_TOOLS
+          (default: final);
+        - an answer to a long-form request (LONG_FORM_KEYWORDS or
+          LONG_FORM_MIN_CHARS) goes to the final tier;
+        - anything else is a short reply and stays on ``tier``.
+
+    Args:
+        history (List): The history passed to route_turn.
+        tier (str): Tier of the call that replied.
+
+    Returns:
+        tuple: (tier, reason) to write the answer with, or None to keep the reply of ``tier``.
+    """
+    if LLM_ROUTING != "tiered":
+        return None
+
+    last_human = next((i for i in range(len(history) - 1, -1, -1) if history[i].type == "human"), None)
+    turn = history[last_human:] if last_human is not None else history
+
+    if any(msg.type == "tool" for msg in turn):
+        route = ROUTE_AFTER_TOOLS, "answer after tool results"
+    elif last_human is not None and is_long_form(str(history[last_human].content)):
+        route = "final", "long-form request"
+    else:
+        return None
+
+    return route if route[0] != tier else None
+
+
+def select_model(tier: str, reason: str) -> str:
+    """Resolve ``tier`` to its model, counting and logging the decision."""
+    model = MODEL_TIERS[tier]
+    route_counts[(tier, reason)] = route_counts.get((tier, reason), 0) + 1
+    logger.info(f"Routing to {tier} model {model}: {reason}.")
+    return model
+
+
+def routing_stats() -> dict:
+    """Per-tier model, latency and token counters plus decision counts by reason."""
+    return {
+        "mode": LLM_ROUTING,
+        "tiers": {tier: {"model": MODEL_TIERS[tier], **tier_usage[tier].stats()} for tier in MODEL_TIERS},
+        "decisions": [
+            {"tier": tier, "reason": reason, "count": count}
+            for (tier, reason), count in sorted(route_counts.items())
+        ],
+    }
@@ -30,32 +30,79 @@ tools = [
         "user_query": {
           "type": "string",
           "description": "The user query from which to retrieve relevant documents."
+        },
+        "queries": {
+          "type": "array",
+          "items": {"type": "string"},
+          "description": "Optional alternative phrasings of the query, retrieved in the same call and fused into one ranking."
+        },
+        "filters": {
+          "type": "object",
+          "description": "Optional filters that narrow the search to matching documents.",
+          "properties": {
+            "sector": {"type": "string", "description": "Only documents about this sector."},
+            "fund": {"type": "string", "description": "Only documents belonging to this fund."},
+            "doc_type": {"type": "string", "description": "Only documents of this type, e.g. thesis, memo, policy."},
+            "date_from": {"type": "string", "description": "Only documents dated on or after this ISO date."},
+            "date_to": {"type": "string", "description": "Only documents dated on or before this ISO date."}
+          }
+        },
+        "top_k": {
+          "type": "integer",
+          "description": "Number of documents to return (default 20, max 50)."
+        },
+        "snippets_only": {
+          "type": "boolean",
+          "description": "Return ids and short snippets only; use rag_fetch to read the full text of the documents you need."
         }
       },
       "required": ["user_query"]
     }
   }
 },
+{
+  "type": "function",
+  "function": {
+    "name": "rag_fetch",
+    "description": "Fetches the full text of internal knowledge-base documents by id, e.g. after a snippets_only rag_retrieve.",
+    "parameters": {
+      "type": "object",
+      "properties": {
+        "ids": {
+          "type": "array",
+          "items": {"type": "string"},
+          "description": "Document ids returned by rag_retrieve."
+        }
+      },
+      "required": ["ids"]
+    }
+  }
+},
 {
   "type": "function",
   "function": {
     "name": "web_scrap",
-    "description": "Scrapes a webpage using Tavily extract and returns structured extraction data.",
+    "description": "Scrapes one or more webpages in a single Tavily extract call and returns the cleaned text per URL. Pass every page you need (e.g. home, pricing, team, blog) in one call; URLs that fail are listed separately.",
     "parameters": {
       "type": "object",
       "properties": {
+        "urls": {
+          "type": "array",
+          "items": {"type": "string"},
+          "description": "The URLs of the webpages to scrape."
+        },
         "url": {
           "type": "string",
-          "description": "The URL of the webpage to scrape."
+          "description": "A single URL to scrape (prefer urls)."
         }
       },
-      "required": ["url"]
+      "required": ["urls"]
     }
   }
 },
 ]
 
-Internal_Tools = ["web_search", "web_scrap", "rag_retrieve"]
+Internal_Tools = ["web_search", "web_scrap", "rag_retrieve", "rag_fetch"]
 
 class AgentState(MessagesState):
     query: str
@@ -64,5 +111,14 @@ class AgentState(MessagesState):
     tool_results : List[Dict]
     tool_call_plan : List[Dict]
     tools_used : List[str]
+    pending_external_calls : List[Dict]
+    internal_tool_results : List[Dict]
+    seen_results : Dict[str, List[str]]
+    context_summary : str
+    summarized_count : int
+    mode : str
+    company : str
+    market : str
+    evaluation : Dict
 
     
\ No newline at end of file
@@ -0,0 +1,324 @@
+import os
+import json
+import time
+import asyncio
+import sqlite3
+import hashlib
+import logging
+import threading
+from functools import wraps
+from collections import OrderedDict
+from urllib.parse import urlsplit, urlunsplit, parse_qsl, urlencode
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+TOOL_CACHE_MAX_ENTRIES = int(os.getenv("TOOL_CACHE_MAX_ENTRIES", 1024))
+TOOL_CACHE_DISK_PATH = os.getenv("TOOL_CACHE_DISK_PATH")
+TOOL_CACHE_DISK_PURGE_INTERVAL = float(os.getenv("TOOL_CACHE_DISK_PURGE_INTERVAL", 60))
+
+TOOL_CACHE_TTLS = {
+    "web_search": float(os.getenv("TOOL_CACHE_TTL_WEB_SEARCH", 15 * 60)),
+    "web_scrap": float(os.getenv("TOOL_CACHE_TTL_WEB_SCRAP", 60 * 60)),
+    "rag_retrieve": float(os.getenv("TOOL_CACHE_TTL_RAG_RETRIEVE", 10 * 60)),
+    "rag_fetch": float(os.getenv("TOOL_CACHE_TTL_RAG_FETCH", 10 * 60)),
+}
+
+# Only these arguments are normalized; ids and filter values are matched
+# case-sensitively by the tools and must keep distinct cache keys.
+FREE_TEXT_ARGS = {"query", "queries", "user_query"}
+URL_ARGS = {"url", "urls"}
+
+_TRACKING_PARAMS = {"fbclid", "gclid", "mc_cid", "mc_eid", "ref"}
+_DEFAULT_PORTS = {"http": 80, "https": 443}
+
+
+def canonical_url(url: str) -> str:
+    """
+    Canonicalize a URL for cache keys: lower-case scheme and host, drop
+    default ports, fragments, tracking parameters and trailing slashes, and
+    sort the remaining query parameters.
+    """
+    parts = urlsplit(url.strip())
+    scheme = parts.scheme.lower()
+    host = (parts.hostname or "").lower()
+
+    if parts.port and parts.port != _DEFAULT_PORTS.get(scheme):
+        host = f"{host}:{parts.port}"
+
+    path = parts.path.rstrip("/") or "/"
+    query = urlencode(sorted(
+        (k, v) for k, v in parse_qsl(parts.query, keep_blank_values=True)
+        if not (k.lower().startswith("utm_") or k.lower() in _TRACKING_PARAMS)
+    ))
+
+    return urlunsplit((scheme, host, path, query, ""))
+
+
+def normalize_text(text: str) -> str:
+    """Collapse whitespace and case-fold free text such as search queries."""
+    return " ".join(text.split()).casefold()
+
+
+def normalize_args(value, name: str = None):
+    """
+    Recursively normalize tool arguments so equivalent calls share a cache key.
+
+    Free-text arguments (FREE_TEXT_ARGS) are whitespace-collapsed and
+    case-folded and URL arguments (URL_ARGS) are canonicalized; every other
+    value is kept as is.
+    """
+    if isinstance(value, str):
+        if name in URL_ARGS:
+            return canonical_url(value)
+        if name in FREE_TEXT_ARGS:
+            return normalize_text(value)
+        return value
+    if isinstance(value, dict):
+        return {k: normalize_args(v, k) for k, v in sorted(value.items())}
+    if isinstance(value, (list, tuple)):
+        return [normalize_args(v, name) for v in value]
+    return value
+
+
+def tool_cache_key(name: str, args: dict) -> str:
+    """Build a stable cache key for a tool call from its name and normalized arguments."""
+    payload = json.dumps([name, normalize_args(args)], sort_keys=True, default=str)
+    return hashlib.sha256(payload.encode()).hexdigest()
+
+
+class TTLCache:
+    """Size-bounded LRU cache whose entries expire after a fixed TTL."""
+
+    def __init__(self, ttl: float, max_entries: int = TOOL_CACHE_MAX_ENTRIES):
+        self.ttl = ttl
+        self.max_entries = max_entries
+        self._entries: "OrderedDict[str, tuple]" = OrderedDict()
+        self._lock = threading.Lock()
+
+    def get(self, key: str):
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None:
+                return None
+            expires_at, value = entry
+            if expires_at < time.time():
+                del self._entries[key]
+                return None
+            self._entries.move_to_end(key)
+            return value
+
+    def set(self, key: str, value, expires_at: float = None):
+        with self._lock:
+            self._entries[key] = (expires_at or time.time() + self.ttl, value)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_entries:
+                self._entries.popitem(last=False)
+
+    def __len__(self):
+        return len(self._entries)
+
+
+class DiskCache:
+    """
+    Optional persistent tier shared by every tool, stored in a SQLite file.
+
+    Values are stored as JSON with their absolute expiry time, so entries
+    survive restarts and are shared by all workers on the host. Expired rows
+    are deleted on write, at most every ``purge_interval`` seconds, using an
+    index on the expiry time.
+    """
+
+    def __init__(self, path: str, purge_interval: float = TOOL_CACHE_DISK_PURGE_INTERVAL):
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute(
+            "CREATE TABLE IF NOT EXISTS tool_cache (key TEXT PRIMARY KEY, expires_at REAL, value TEXT)"
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS tool_cache_expires_at ON tool_cache (expires_at)")
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self.purge_interval = purge_interval
+        self.purged = 0
+        self._last_purge = 0.0
+
+    def get(self, key: str):
+        with self._lock:
+            row = self._conn.execute(
+                "SELECT expires_at, value FROM tool_cache WHERE key = ?", (key,)
+            ).fetchone()
+        if row is None or row[0] < time.time():
+            return None
+        return row[0], json.loads(row[1])
+
+    def set(self, key: str, value, expires_at: float):
+        with self._lock:
+            self._conn.execute(
+                "INSERT OR REPLACE INTO tool_cache (key, expires_at, value) VALUES (?, ?, ?)",
+                (key, expires_at, json.dumps(value)),
+            )
+            if time.monotonic() - self._last_purge >= self.purge_interval:
+                self._last_purge = time.monotonic()
+                self.purged += self._conn.execute(
+                    "DELETE FROM tool_cache WHERE expires_at < ?", (time.time(),)
+                ).rowcount
+            self._conn.commit()
+
+
+class ToolCache:
+    """Two-tier (memory, optional disk) result cache for one tool, with hit-rate counters."""
+
+    def __init__(self, name: str, ttl: float, disk: DiskCache = None):
+        self.name = name
+        self.ttl = ttl
+        self.memory = TTLCache(ttl)
+        self.disk = disk
+        self.hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    def get(self, key: str):
+        value = self.memory.get(key)
+        if value is not None:
+            self.hits += 1
+            return value
+
+        if self.disk is not None:
+            entry = self.disk.get(key)
+            if entry is not None:
+                expires_at, value = entry
+                self.memory.set(key, value, expires_at)
+                self.hits += 1
+                self.disk_hits += 1
+                return value
+
+        self.misses += 1
+        return None
+
+    def set(self, key: str, value):
+        expires_at = time.time() + self.ttl
+        self.memory.set(key, value, expires_at)
+        if self.disk is not None:
+            try:
+                self.disk.set(key, value, expires_at)
+            except (TypeError, ValueError) as e:
+                logging.warning(f"Could not persist {self.name} result to disk cache : {e}")
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self.memory),
+            "ttl": self.ttl,
+            "hits": self.hits,
+            "disk_hits": self.disk_hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+        }
+
+
+_disk_cache = DiskCache(TOOL_CACHE_DISK_PATH) if TOOL_CACHE_DISK_PATH else None
+_caches = {}
+
+
+def get_tool_cache(name: str) -> ToolCache:
+    """Return the shared cache for ``name``, creating it with the configured TTL."""
+    if name not in _caches:
+        _caches[name] = ToolCache(name, TOOL_CACHE_TTLS.get(name, 10 * 60), _disk_cache)
+    return _caches[name]
+
+
+def cached_tool(name: str, fn):
+    """
+    Wrap a tool callable with the shared result cache.
+
+    Empty results (the tools return ``[]`` when the upstream call fails) are
+    not cached, so a transient error is retried on the next call.
+
+    Args:
+        name (str): Tool name, used for the TTL and metrics.
+        fn (callable): The tool implementation, called with keyword arguments.
+
+    Returns:
+        callable: The cached tool.
+    """
+    cache = get_tool_cache(name)
+
+    @wraps(fn)
+    def wrapper(**kwargs):
+        key = tool_cache_key(name, kwargs)
+        result = cache.get(key)
+        if result is not None:
+            logging.info(f"Cache hit for {name}.")
+            return result
+
+        result = fn(**kwargs)
+        if result:
+            cache.set(key, result)
+        return result
+
+    return wrapper
+
+
+class SingleFlight:
+    """
+    Coalesce identical concurrent tool calls into one upstream request.
+
+    The first caller for a key starts the work; callers that arrive while it
+    is still in flight await the same task and receive its result (or its
+    exception). The shared task is shielded, so a caller that times out or is
+    cancelled does not cancel the work for the others.
+    """
+
+    def __init__(self):
+        self._inflight = {}
+        self._counters = {}
+
+    async def do(self, name: str, key: str, fn):
+        """
+        Run ``fn()`` for ``key`` unless an identical call is already in flight.
+
+        Args:
+            name (str): Tool name, used for the counters.
+            key (str): Normalized call key, see ``tool_cache_key``.
+            fn (callable): Zero-argument callable returning an awaitable.
+
+        Returns:
+            Any: The result of the shared call.
+        """
+        counters = self._counters.setdefault(name, {"calls": 0, "deduplicated": 0})
+        flight_key = (id(asyncio.get_running_loop()), name, key)
+
+        task = self._inflight.get(flight_key)
+        if task is not None:
+            counters["deduplicated"] += 1
+            logging.info(f"Joining in-flight {name} call.")
+        else:
+            counters["calls"] += 1
+            task = asyncio.ensure_future(fn())
+            self._inflight[flight_key] = task
+            task.add_done_callback(lambda done: self._finish(flight_key, done))
+
+        return await asyncio.shield(task)
+
+    def _finish(self, flight_key: tuple, task: asyncio.Future):
+        if self._inflight.get(flight_key) is task:
+            del self._inflight[flight_key]
+        # Mark the exception as retrieved in case every waiter was cancelled.
+        if not task.cancelled():
+            task.exception()
+
+    def stats(self) -> dict:
+        """Return per-tool upstream call and deduplication counters."""
+        return {
+            name: {**counters, "in_flight": sum(1 for k in self._inflight if k[1] == name)}
+            for name, counters in self._counters.items()
+        }
+
+
+tool_flights = SingleFlight()
+
+
+def cache_stats() -> dict:
+    """Return hit/miss counters for every tool cache."""
+    return {name: cache.stats() for name, cache in _caches.items()}
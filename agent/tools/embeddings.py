@@ -0,0 +1,162 @@
+import os
+import time
+import sqlite3
+import hashlib
+import logging
+import threading
+from typing import List
+from collections import OrderedDict
+
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+EMBEDDING_CACHE_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_MAX_ENTRIES", 4096))
+EMBEDDING_CACHE_PATH = os.getenv("EMBEDDING_CACHE_PATH")
+EMBEDDING_CACHE_DISK_MAX_ENTRIES = int(os.getenv("EMBEDDING_CACHE_DISK_MAX_ENTRIES", 200_000))
+EMBEDDING_CACHE_DISK_TTL = float(os.getenv("EMBEDDING_CACHE_DISK_TTL", 30 * 24 * 3600))
+EMBEDDING_CACHE_DISK_PURGE_INTERVAL = float(os.getenv("EMBEDDING_CACHE_DISK_PURGE_INTERVAL", 60))
+
+
+def embedding_key(model: str, text: str) -> str:
+    """Content hash identifying the embedding of ``text`` under ``model``."""
+    return hashlib.sha256(f"{model}\0{text}".encode()).hexdigest()
+
+
+class EmbeddingCache:
+    """
+    LRU cache of query embeddings keyed by content hash.
+
+    Vectors are kept as contiguous float32 arrays (4 bytes per dimension,
+    a quarter of the equivalent list of Python floats). When a path is given,
+    vectors are also written to a SQLite file as raw float32 blobs so the
+    cache survives restarts. The disk tier records when each row was last
+    written or read; on write, at most every ``disk_purge_interval``
+    seconds, rows unused for ``disk_ttl`` seconds and the least recently used
+    rows beyond ``disk_max_entries`` are deleted.
+    """
+
+    def __init__(
+        self,
+        max_entries: int = EMBEDDING_CACHE_MAX_ENTRIES,
+        path: str = EMBEDDING_CACHE_PATH,
+        disk_max_entries: int = EMBEDDING_CACHE_DISK_MAX_ENTRIES,
+        disk_ttl: float = EMBEDDING_CACHE_DISK_TTL,
+        disk_purge_interval: float = EMBEDDING_CACHE_DISK_PURGE_INTERVAL,
+    ):
+        self.max_entries = max_entries
+        self.disk_max_entries = disk_max_entries
+        self.disk_ttl = disk_ttl
+        self.disk_purge_interval = disk_purge_interval
+        self.hits = 0
+        self.misses = 0
+        self.purged = 0
+        self._last_purge = 0.0
+        self._entries: "OrderedDict[str, np.ndarray]" = OrderedDict()
+        self._lock = threading.Lock()
+        self._conn = None
+
+        if path:
+            self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+            self._conn.execute("PRAGMA journal_mode=WAL")
+            self._conn.execute("CREATE TABLE IF NOT EXISTS embeddings (key TEXT PRIMARY KEY, vector BLOB, last_used REAL)")
+            columns = [row[1] for row in self._conn.execute("PRAGMA table_info(embeddings)")]
+            if "last_used" not in columns:
+                self._conn.execute("ALTER TABLE embeddings ADD COLUMN last_used REAL")
+                self._conn.execute("UPDATE embeddings SET last_used = ?", (time.time(),))
+            self._conn.execute("CREATE INDEX IF NOT EXISTS embeddings_last_used ON embeddings (last_used)")
+            self._conn.commit()
+
+    def get(self, key: str):
+        with self._lock:
+            vector = self._entries.get(key)
+            if vector is not None:
+                self._entries.move_to_end(key)
+                self.hits += 1
+                return vector
+
+            if self._conn is not None:
+                row = self._conn.execute("SELECT vector FROM embeddings WHERE key = ?", (key,)).fetchone()
+                if row is not None:
+                    vector = np.frombuffer(row[0], dtype=np.float32)
+                    self._remember(key, vector)
+                    self._conn.execute("UPDATE embeddings SET last_used = ? WHERE key = ?", (time.time(), key))
+                    self._conn.commit()
+                    self.hits += 1
+                    return vector
+
+            self.misses += 1
+            return None
+
+    def put(self, key: str, vector: np.ndarray):
+        with self._lock:
+            self._remember(key, vector)
+            if self._conn is not None:
+                self._conn.execute(
+                    "INSERT OR REPLACE INTO embeddings (key, vector, last_used) VALUES (?, ?, ?)",
+                    (key, vector.tobytes(), time.time()),
+                )
+                if time.monotonic() - self._last_purge >= self.disk_purge_interval:
+                    self._last_purge = time.monotonic()
+                    self._purge_disk()
+                self._conn.commit()
+
+    def _purge_disk(self):
+        """Delete disk rows unused for ``disk_ttl`` and the least recently used beyond ``disk_max_entries``."""
+        self.purged += self._conn.execute(
+            "DELETE FROM embeddings WHERE last_used < ?", (time.time() - self.disk_ttl,)
+        ).rowcount
+        excess = self._conn.execute("SELECT COUNT(*) FROM embeddings").fetchone()[0] - self.disk_max_entries
+        if excess > 0:
+            self.purged += self._conn.execute(
+                "DELETE FROM embeddings WHERE key IN (SELECT key FROM embeddings ORDER BY last_used LIMIT ?)", (excess,)
+            ).rowcount
+
+    def _remember(self, key: str, vector: np.ndarray):
+        self._entries[key] = vector
+        self._entries.move_to_end(key)
+        while len(self._entries) > self.max_entries:
+            self._entries.popitem(last=False)
+
+    def stats(self) -> dict:
+        lookups = self.hits + self.misses
+        return {
+            "entries": len(self._entries),
+            "bytes": sum(v.nbytes for v in self._entries.values()),
+            "hits": self.hits,
+            "misses": self.misses,
+            "hit_rate": self.hits / lookups if lookups else 0.0,
+            "disk_purged": self.purged,
+        }
+
+
+embedding_cache = EmbeddingCache()
+
+
+def embed_texts(client, texts: List[str], model: str) -> List[np.ndarray]:
+    """
+    Embed ``texts``, serving cached vectors locally and sending every miss in
+    a single batched embeddings request.
+
+    Args:
+        client: OpenAI client used for cache misses.
+        texts (List[str]): Texts to embed.
+        model (str): Embeddings model name.
+
+    Returns:
+        List[np.ndarray]: One float32 vector per input text, in input order.
+    """
+    keys = [embedding_key(model, text) for text in texts]
+    vectors = {key: embedding_cache.get(key) for key in set(keys)}
+
+    missing = {key: text for key, text in zip(keys, texts) if vectors[key] is None}
+    if missing:
+        logging.info(f"Embedding {len(missing)} uncached texts in one request.")
+        response = client.embeddings.create(input=list(missing.values()), model=model)
+        for key, item in zip(missing, sorted(response.data, key=lambda d: d.index)):
+            vector = np.asarray(item.embedding, dtype=np.float32)
+            embedding_cache.put(key, vector)
+            vectors[key] = vector
+
+    return [vectors[key] for key in keys]
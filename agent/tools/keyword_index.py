@@ -0,0 +1,212 @@
+import os
+import re
+import math
+import sqlite3
+import logging
+import threading
+from typing import List, Optional, Tuple
+from collections import Counter
+
+from dotenv import load_dotenv
+
+load_dotenv()
+
+KEYWORD_INDEX_PATH = os.getenv("KEYWORD_INDEX_PATH", "keyword_index.sqlite")
+KEYWORD_MAX_QUERY_TERMS = int(os.getenv("KEYWORD_MAX_QUERY_TERMS", 6))
+KEYWORD_MIN_IDF = float(os.getenv("KEYWORD_MIN_IDF", 3.0))
+
+BM25_K1 = 1.2
+BM25_B = 0.75
+
+_TOKEN = re.compile(r"\w{2,}")
+_STOPWORDS = frozenset(
+    "a an and are as at be by for from has have in is it its of on or that the this to was were will with "
+    "who what which about tell me find show information info details company startup".split()
+)
+
+
+def tokenize(text: str) -> List[str]:
+    return [t for t in _TOKEN.findall(text.lower()) if t not in _STOPWORDS]
+
+
+class KeywordIndex:
+    """
+    Incrementally updated BM25 inverted index stored in SQLite.
+
+    Terms are interned in a ``terms`` table and postings are kept in a
+    ``WITHOUT ROWID`` table keyed by (term_id, doc_key), so each posting is
+    three integers: term id, document key and term frequency. Adding a
+    document that is already indexed replaces its postings.
+
+    Corpus statistics (document count, average length, term count) are
+    cached and only recomputed after this index wrote or another connection
+    (e.g. a running ingestion) committed, as reported by ``data_version``.
+    """
+
+    def __init__(self, path: str = KEYWORD_INDEX_PATH):
+        self._conn = sqlite3.connect(path, timeout=30, check_same_thread=False)
+        columns = [row[1] for row in self._conn.execute("PRAGMA table_info(terms)")]
+        if columns and "term_id" not in columns:
+            logging.warning(f"Dropping keyword index {path} in the old format; rebuild it with `python -m agent.ingest --reindex-keywords`.")
+            self._conn.executescript("DROP TABLE IF EXISTS postings; DROP TABLE IF EXISTS terms; DROP TABLE IF EXISTS docs;")
+        self._conn.executescript("""
+            PRAGMA journal_mode=WAL;
+            CREATE TABLE IF NOT EXISTS docs (doc_key INTEGER PRIMARY KEY, doc_id TEXT UNIQUE, length INTEGER);
+            CREATE TABLE IF NOT EXISTS terms (term_id INTEGER PRIMARY KEY, term TEXT UNIQUE, df INTEGER);
+            CREATE TABLE IF NOT EXISTS postings (
+                term_id INTEGER, doc_key INTEGER, tf INTEGER, PRIMARY KEY (term_id, doc_key)
+            ) WITHOUT ROWID;
+            CREATE INDEX IF NOT EXISTS postings_doc ON postings (doc_key);
+        """)
+        self._conn.commit()
+        self._lock = threading.Lock()
+        self._stats = None
+        self._stats_version = None
+
+    def _corpus_stats(self) -> Tuple[int, float, int]:
+        """Return (document count, average length, term count), recomputed only when the data changed."""
+        version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+        if self._stats is None or version != self._stats_version:
+            count, total = self._conn.execute("SELECT COUNT(*), COALESCE(SUM(length), 0) FROM docs").fetchone()
+            terms = self._conn.execute("SELECT COUNT(*) FROM terms WHERE df > 0").fetchone()[0]
+            self._stats = (count, (total / count if count else 0.0), terms)
+            self._stats_version = version
+        return self._stats
+
+    def __len__(self):
+        with self._lock:
+            return self._corpus_stats()[0]
+
+    def add(self, docs: List[Tuple[str, str]]):
+        """
+        Index or re-index documents.
+
+        Args:
+            docs (List[Tuple[str, str]]): ``(doc_id, text)`` pairs.
+        """
+        with self._lock, self._conn:
+            for doc_id, text in docs:
+                tokens = tokenize(text or "")
+                row = self._conn.execute("SELECT doc_key FROM docs WHERE doc_id = ?", (doc_id,)).fetchone()
+
+                if row is not None:
+                    doc_key = row[0]
+                    self._remove_postings(doc_key)
+                    self._conn.execute("UPDATE docs SET length = ? WHERE doc_key = ?", (len(tokens), doc_key))
+                else:
+                    doc_key = self._conn.execute(
+                        "INSERT INTO docs (doc_id, length) VALUES (?, ?)", (doc_id, len(tokens))
+                    ).lastrowid
+
+                counts = Counter(tokens)
+                term_ids = self._term_ids(list(counts))
+                self._conn.executemany(
+                    "INSERT INTO postings (term_id, doc_key, tf) VALUES (?, ?, ?)",
+                    [(term_ids[term], doc_key, tf) for term, tf in counts.items()],
+                )
+                self._conn.executemany(
+                    "UPDATE terms SET df = df + 1 WHERE term_id = ?", [(term_ids[term],) for term in counts]
+                )
+            self._stats = None
+
+    def delete(self, doc_ids: List[str]):
+        """Remove documents (and their postings) from the index."""
+        with self._lock, self._conn:
+            for doc_id in doc_ids:
+                row = self._conn.execute("SELECT doc_key FROM docs WHERE doc_id = ?", (doc_id,)).fetchone()
+                if row is not None:
+                    self._remove_postings(row[0])
+                    self._conn.execute("DELETE FROM docs WHERE doc_key = ?", (row[0],))
+            self._stats = None
+
+    def _term_ids(self, terms: List[str]) -> dict:
+        """Return the id of every term, interning the new ones."""
+        ids = {}
+        for start in range(0, len(terms), 500):
+            batch = terms[start:start + 500]
+            self._conn.executemany("INSERT OR IGNORE INTO terms (term, df) VALUES (?, 0)", [(t,) for t in batch])
+            ids.update((term, term_id) for term_id, term in self._conn.execute(
+                f"SELECT term_id, term FROM terms WHERE term IN ({','.join('?' * len(batch))})", batch
+            ))
+        return ids
+
+    def _remove_postings(self, doc_key: int):
+        term_ids = self._conn.execute("SELECT term_id FROM postings WHERE doc_key = ?", (doc_key,)).fetchall()
+        self._conn.executemany("UPDATE terms SET df = df - 1 WHERE term_id = ?", term_ids)
+        self._conn.execute("DELETE FROM postings WHERE doc_key = ?", (doc_key,))
+
+    def search(self, query: str, top_k: int = 20) -> dict:
+        """
+        Score documents for ``query`` with BM25.
+
+        Returns:
+            dict: ``hits`` as ``(doc_id, score, matched_terms)`` best first,
+            ``terms`` (the query terms) and ``idf`` per query term.
+        """
+        terms = list(dict.fromkeys(tokenize(query)))
+
+        with self._lock:
+            count, avg_length, _ = self._corpus_stats()
+            if not count or not terms:
+                return {"hits": [], "terms": terms, "idf": {}}
+
+            scores = Counter()
+            matched = {}
+            idf = {}
+            for term in terms:
+                row = self._conn.execute("SELECT term_id, df FROM terms WHERE term = ?", (term,)).fetchone()
+                df = row[1] if row else 0
+                idf[term] = math.log(1 + (count - df + 0.5) / (df + 0.5))
+                if not df:
+                    continue
+
+                for doc_id, tf, length in self._conn.execute(
+                    "SELECT d.doc_id, p.tf, d.length FROM postings p JOIN docs d ON d.doc_key = p.doc_key WHERE p.term_id = ?",
+                    (row[0],),
+                ):
+                    norm = BM25_K1 * (1 - BM25_B + BM25_B * length / (avg_length or 1))
+                    scores[doc_id] += idf[term] * tf * (BM25_K1 + 1) / (tf + norm)
+                    matched[doc_id] = matched.get(doc_id, 0) + 1
+
+        hits = [(doc_id, score, matched[doc_id]) for doc_id, score in scores.most_common(top_k)]
+        return {"hits": hits, "terms": terms, "idf": idf}
+
+    def stats(self) -> dict:
+        with self._lock:
+            count, avg_length, terms = self._corpus_stats()
+        return {"documents": count, "terms": terms, "avg_length": avg_length}
+
+    @staticmethod
+    def is_confident(result: dict) -> bool:
+        """
+        Decide whether a keyword result can answer the query on its own.
+
+        That is the case for short, name-like lookups: at most
+        KEYWORD_MAX_QUERY_TERMS terms, at least one rare term
+        (idf >= KEYWORD_MIN_IDF), and a top hit containing every query term.
+        """
+        terms, hits = result["terms"], result["hits"]
+        return (
+            bool(hits)
+            and 0 < len(terms) <= KEYWORD_MAX_QUERY_TERMS
+            and max(result["idf"].values()) >= KEYWORD_MIN_IDF
+            and hits[0][2] == len(terms)
+        )
+
+
+_index = None
+
+
+def get_keyword_index(create: bool = True) -> Optional[KeywordIndex]:
+    """
+    Return the process-wide keyword index opened at KEYWORD_INDEX_PATH.
+
+    Read paths pass ``create=False`` so that they get None instead of
+    creating an empty index file when nothing has been ingested yet.
+    """
+    global _index
+    if _index is None:
+        if not create and not os.path.exists(KEYWORD_INDEX_PATH):
+            return None
+        _index = KeywordIndex()
+    return _index
@@ -0,0 +1,361 @@
+import os
+import json
+import sqlite3
+import logging
+import threading
+from typing import List
+
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+LOCAL_INDEX_PATH = os.getenv("LOCAL_INDEX_PATH", "vector_index")
+LOCAL_INDEX_NPROBE = int(os.getenv("LOCAL_INDEX_NPROBE", 8))
+LOCAL_INDEX_IVF_MIN_ROWS = int(os.getenv("LOCAL_INDEX_IVF_MIN_ROWS", 50_000))
+LOCAL_INDEX_FILTER_OVERSAMPLE = int(os.getenv("LOCAL_INDEX_FILTER_OVERSAMPLE", 10))
+
+
+def _normalize(matrix: np.ndarray) -> np.ndarray:
+    norms = np.linalg.norm(matrix, axis=-1, keepdims=True)
+    return matrix / np.where(norms == 0, 1, norms)
+
+
+def _inverted_lists(assignments: np.ndarray, n_lists: int):
+    """Return (rows ordered by list, offset of each list in that order)."""
+    order = np.argsort(assignments, kind="stable")
+    offsets = np.concatenate([[0], np.cumsum(np.bincount(assignments, minlength=n_lists))])
+    return order, offsets
+
+
+class LocalVectorIndex:
+    """
+    On-disk vector index for offline use and tests.
+
+    Layout under ``path``:
+        - ``embeddings.f32``: contiguous row-major float32 matrix of unit
+          vectors, memory-mapped for search so the OS page cache holds it;
+        - ``docs.sqlite``: side store mapping row number to id, text and metadata;
+        - ``meta.json``: dimension and row count;
+        - ``ivf.npz``: optional IVF centroids, per-row list assignment and
+          the inverted lists (rows grouped by list, with per-list offsets).
+
+    Search is a vectorized cosine similarity (dot product of unit vectors)
+    with ``argpartition`` top-k. When an IVF is built and the index is large,
+    only the rows of the ``nprobe`` closest lists are gathered and scored.
+    The IVF is built by ``python -m agent.ingest --build-ivf`` and
+    automatically once the index reaches LOCAL_INDEX_IVF_MIN_ROWS rows or
+    doubles in size since the last build (see ``needs_ivf``).
+    """
+
+    def __init__(self, path: str = LOCAL_INDEX_PATH):
+        self.path = path
+        os.makedirs(path, exist_ok=True)
+
+        self._matrix_path = os.path.join(path, "embeddings.f32")
+        self._meta_path = os.path.join(path, "meta.json")
+        self._ivf_path = os.path.join(path, "ivf.npz")
+        self._lock = threading.RLock()
+
+        self._docs = sqlite3.connect(os.path.join(path, "docs.sqlite"), timeout=30, check_same_thread=False)
+        self._docs.execute("PRAGMA journal_mode=WAL")
+        self._docs.execute(
+            "CREATE TABLE IF NOT EXISTS docs (row INTEGER PRIMARY KEY, id TEXT UNIQUE, text TEXT, metadata TEXT)"
+        )
+        self._docs.commit()
+
+        self._meta_mtime = None
+        self._load()
+
+    def _load(self):
+        meta = {"dim": 0, "count": 0}
+        if os.path.exists(self._meta_path):
+            with open(self._meta_path) as f:
+                meta = json.load(f)
+            self._meta_mtime = os.path.getmtime(self._meta_path)
+
+        self.dim = meta["dim"]
+        self.count = meta["count"]
+        self.matrix = (
+            np.memmap(self._matrix_path, dtype=np.float32, mode="r", shape=(self.count, self.dim))
+            if self.count else np.empty((0, self.dim), dtype=np.float32)
+        )
+
+        self.centroids = None
+        self.lists = None
+        self.list_rows = None
+        self.list_offsets = None
+        self.ivf_rows = 0
+        if os.path.exists(self._ivf_path):
+            with np.load(self._ivf_path) as ivf:
+                self.centroids = ivf["centroids"]
+                self.lists = ivf["assignments"]
+                if "offsets" in ivf:
+                    self.list_rows, self.list_offsets = ivf["order"], ivf["offsets"]
+                else:
+                    self.list_rows, self.list_offsets = _inverted_lists(self.lists, len(self.centroids))
+                self.ivf_rows = int(ivf["trained_rows"]) if "trained_rows" in ivf else len(self.lists)
+
+    def _save_ivf(self, centroids: np.ndarray, assignments: np.ndarray, trained_rows: int):
+        order, offsets = _inverted_lists(assignments, len(centroids))
+        np.savez(
+            self._ivf_path, centroids=centroids, assignments=assignments,
+            order=order, offsets=offsets, trained_rows=trained_rows,
+        )
+        self.centroids, self.lists, self.ivf_rows = centroids, assignments, trained_rows
+        self.list_rows, self.list_offsets = order, offsets
+
+    def _refresh(self):
+        """Pick up rows appended by another process (e.g. a running ingestion)."""
+        if os.path.exists(self._meta_path) and os.path.getmtime(self._meta_path) != self._meta_mtime:
+            self._load()
+
+    def _save_meta(self):
+        tmp = self._meta_path + ".tmp"
+        with open(tmp, "w") as f:
+            json.dump({"dim": self.dim, "count": self.count}, f)
+        os.replace(tmp, self._meta_path)
+
+    def __len__(self):
+        return self.count
+
+    def add(self, docs: List[dict], embeddings: np.ndarray):
+        """
+        Insert or update documents.
+
+        Existing ids are overwritten in place; new ids are appended to the
+        matrix. Written rows are (re)assigned to their closest IVF list if one
+        exists.
+
+        Args:
+            docs (List[dict]): Documents with ``id``, ``text`` and ``metadata``.
+            embeddings (np.ndarray): One embedding per document.
+        """
+        vectors = _normalize(np.asarray(embeddings, dtype=np.float32))
+        if not len(docs):
+            return
+
+        with self._lock:
+            self._refresh()
+            if self.dim and vectors.shape[1] != self.dim:
+                raise ValueError(f"Embedding dimension {vectors.shape[1]} does not match index dimension {self.dim}.")
+            self.dim = vectors.shape[1]
+
+            ids = [doc["id"] for doc in docs]
+            placeholders = ",".join("?" * len(ids))
+            existing = dict(self._docs.execute(
+                f"SELECT id, row FROM docs WHERE id IN ({placeholders})", ids
+            ).fetchall())
+
+            rows = []
+            appended = []
+            updated = {}
+            for doc, vector in zip(docs, vectors):
+                row = existing.get(doc["id"])
+                if row is None:
+                    row = self.count + len(appended)
+                    appended.append(vector)
+                else:
+                    self._write_row(row, vector)
+                    updated[row] = vector
+                rows.append((row, doc["id"], doc.get("text"), json.dumps(doc.get("metadata"))))
+
+            if appended:
+                with open(self._matrix_path, "ab") as f:
+                    f.write(np.stack(appended).astype(np.float32).tobytes())
+
+            self._docs.executemany(
+                "INSERT OR REPLACE INTO docs (row, id, text, metadata) VALUES (?, ?, ?, ?)", rows
+            )
+            self._docs.commit()
+
+            self.count += len(appended)
+            if self.centroids is not None and (appended or updated):
+                lists = self.lists.copy()
+                if updated:
+                    changed = np.fromiter(updated, dtype=np.int64)
+                    lists[changed] = np.argmax(np.stack(list(updated.values())) @ self.centroids.T, axis=1)
+                if appended:
+                    new_lists = np.argmax(np.stack(appended) @ self.centroids.T, axis=1).astype(np.int32)
+                    lists = np.concatenate([lists, new_lists])
+                self._save_ivf(self.centroids, lists, self.ivf_rows)
+
+            self._save_meta()
+            self._load()
+
+    def delete(self, ids: List[str]) -> int:
+        """
+        Remove documents by id.
+
+        Their rows are dropped from the side store, so they are never
+        returned again, and their vectors are zeroed in place; the matrix
+        does not shrink.
+
+        Returns:
+            int: Number of documents removed.
+        """
+        if not ids:
+            return 0
+
+        with self._lock:
+            self._refresh()
+            placeholders = ",".join("?" * len(ids))
+            rows = [row for (row,) in self._docs.execute(
+                f"SELECT row FROM docs WHERE id IN ({placeholders})", list(ids)
+            )]
+            if not rows:
+                return 0
+
+            matrix = np.memmap(self._matrix_path, dtype=np.float32, mode="r+", shape=(self.count, self.dim))
+            matrix[rows] = 0
+            matrix.flush()
+            self._docs.execute(f"DELETE FROM docs WHERE id IN ({placeholders})", list(ids))
+            self._docs.commit()
+            return len(rows)
+
+    def _write_row(self, row: int, vector: np.ndarray):
+        matrix = np.memmap(self._matrix_path, dtype=np.float32, mode="r+", shape=(self.count, self.dim))
+        matrix[row] = vector
+        matrix.flush()
+
+    def build_ivf(self, n_lists: int = None, iterations: int = 10, sample_size: int = 100_000, seed: int = 0):
+        """
+        Cluster the rows with spherical k-means and store an IVF prefilter.
+
+        Args:
+            n_lists (int): Number of clusters; defaults to ~sqrt(row count).
+            iterations (int): k-means iterations.
+            sample_size (int): Rows sampled to train the centroids.
+            seed (int): RNG seed for reproducible centroids.
+        """
+        with self._lock:
+            self._refresh()
+            if not self.count:
+                return
+
+            n_lists = n_lists or max(1, int(np.sqrt(self.count)))
+            rng = np.random.default_rng(seed)
+            sample = self.matrix[np.sort(rng.choice(self.count, min(sample_size, self.count), replace=False))]
+            centroids = sample[rng.choice(len(sample), min(n_lists, len(sample)), replace=False)].copy()
+
+            for _ in range(iterations):
+                assignments = np.argmax(sample @ centroids.T, axis=1)
+                for i in range(len(centroids)):
+                    members = sample[assignments == i]
+                    if len(members):
+                        centroids[i] = members.mean(axis=0)
+                centroids = _normalize(centroids)
+
+            assignments = np.concatenate([
+                np.argmax(self.matrix[start:start + 65536] @ centroids.T, axis=1)
+                for start in range(0, self.count, 65536)
+            ]).astype(np.int32)
+
+            self._save_ivf(centroids, assignments, self.count)
+            logging.info(f"Built IVF with {len(centroids)} lists over {self.count} rows.")
+
+    def needs_ivf(self) -> bool:
+        """Whether the index is large enough for an IVF and has none, or has doubled since it was built."""
+        self._refresh()
+        return self.count >= LOCAL_INDEX_IVF_MIN_ROWS and (self.centroids is None or self.count >= 2 * self.ivf_rows)
+
+    def _candidates(self, query: np.ndarray, nprobe: int):
+        if self.centroids is None or self.count < LOCAL_INDEX_IVF_MIN_ROWS:
+            return None
+        probe = np.argsort(self.centroids @ query)[::-1][:nprobe]
+        # Gather the probed inverted lists; sorted rows keep the memmap reads in file order.
+        return np.sort(np.concatenate([
+            self.list_rows[self.list_offsets[i]:self.list_offsets[i + 1]] for i in probe
+        ]))
+
+    def search(self, embedding, top_k: int = 20, nprobe: int = LOCAL_INDEX_NPROBE, predicate=None,
+               include_embeddings: bool = False) -> List[dict]:
+        """
+        Return the ``top_k`` most similar documents, shaped like the Cosmos results.
+
+        Args:
+            embedding: Query embedding.
+            top_k (int): Number of documents to return.
+            nprobe (int): IVF lists to scan when the prefilter is active.
+            predicate (callable, optional): Metadata filter; the search
+                over-fetches by LOCAL_INDEX_FILTER_OVERSAMPLE and keeps matches.
+            include_embeddings (bool): Also return each document's stored (unit) embedding.
+
+        Returns:
+            List[dict]: Documents with id, text, metadata and SimilarityScore, best first.
+        """
+        self._refresh()
+        if not self.count:
+            return []
+
+        query = _normalize(np.asarray(embedding, dtype=np.float32))
+        candidates = self._candidates(query, nprobe)
+
+        scores = (self.matrix if candidates is None else self.matrix[candidates]) @ query
+        k = min(top_k * LOCAL_INDEX_FILTER_OVERSAMPLE if predicate else top_k, len(scores))
+        if k == 0:
+            return []
+
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        rows = top if candidates is None else candidates[top]
+
+        docs = self._fetch(rows.tolist(), scores[top].tolist())
+        if include_embeddings:
+            for doc, row in zip(docs, rows.tolist()):
+                doc["embedding"] = np.array(self.matrix[row])
+        if predicate:
+            docs = [doc for doc in docs if predicate(doc["metadata"] or {})][:top_k]
+        return docs
+
+    def get(self, ids: List[str], include_embeddings: bool = False) -> List[dict]:
+        """Return the stored documents for ``ids`` (missing ids are skipped)."""
+        if not ids:
+            return []
+        if include_embeddings:
+            self._refresh()
+        placeholders = ",".join("?" * len(ids))
+        with self._lock:
+            rows = self._docs.execute(
+                f"SELECT row, id, text, metadata FROM docs WHERE id IN ({placeholders})", list(ids)
+            ).fetchall()
+        docs = [
+            {"id": doc_id, "text": text, "metadata": json.loads(metadata) if metadata else None}
+            for _, doc_id, text, metadata in rows
+        ]
+        if include_embeddings:
+            for doc, (row, *_) in zip(docs, rows):
+                doc["embedding"] = np.array(self.matrix[row])
+        return docs
+
+    def _fetch(self, rows: List[int], scores: List[float]) -> List[dict]:
+        placeholders = ",".join("?" * len(rows))
+        with self._lock:
+            found = {
+                row: (doc_id, text, metadata)
+                for row, doc_id, text, metadata in self._docs.execute(
+                    f"SELECT row, id, text, metadata FROM docs WHERE row IN ({placeholders})", rows
+                )
+            }
+
+        return [
+            {
+                "id": found[row][0],
+                "text": found[row][1],
+                "metadata": json.loads(found[row][2]) if found[row][2] else None,
+                "SimilarityScore": score,
+            }
+            for row, score in zip(rows, scores)
+            if row in found
+        ]
+
+
+_index = None
+
+
+def get_local_index() -> LocalVectorIndex:
+    """Return the process-wide local index opened at LOCAL_INDEX_PATH."""
+    global _index
+    if _index is None:
+        _index = LocalVectorIndex()
+    return _index
@@ -0,0 +1,190 @@
+import os
+import re
+import logging
+import threading
+from typing import List
+
+import numpy as np
+from dotenv import load_dotenv
+
+load_dotenv()
+
+TOKEN_ENCODING = os.getenv("TOKEN_ENCODING", "o200k_base")
+MMR_LAMBDA = float(os.getenv("RETRIEVER_MMR_LAMBDA", 0.7))
+DUPLICATE_THRESHOLD = float(os.getenv("RETRIEVER_DUPLICATE_THRESHOLD", 0.95))
+TOKEN_BUDGET = int(os.getenv("RETRIEVER_TOKEN_BUDGET", 4000))
+DOC_TOKEN_LIMIT = int(os.getenv("RETRIEVER_DOC_TOKEN_LIMIT", 600))
+MIN_DOC_TOKENS = 40
+
+_SENTENCE_SPLIT = re.compile(r"(?<=[.!?])\s+|\n+")
+_WORD = re.compile(r"\w{3,}")
+
+_encoding = None
+_encoding_loaded = False
+_encoding_lock = threading.Lock()
+
+
+def load_encoding():
+    """
+    Load the tiktoken encoding once, on first use or during startup warmup.
+
+    tiktoken downloads the encoding file on first load when it is not in
+    its local cache, so this is kept out of import time. When it cannot be
+    loaded the failure is logged and token counts fall back to an estimate
+    of ~4 characters per token.
+
+    Returns:
+        tiktoken.Encoding: The encoding, or None when the fallback is used.
+    """
+    global _encoding, _encoding_loaded
+    if _encoding_loaded:
+        return _encoding
+
+    with _encoding_lock:
+        if not _encoding_loaded:
+            try:
+                import tiktoken
+                _encoding = tiktoken.get_encoding(TOKEN_ENCODING)
+            except Exception as e:
+                logging.warning(f"Could not load tiktoken encoding '{TOKEN_ENCODING}', estimating tokens as characters / 4 : {e}")
+            _encoding_loaded = True
+    return _encoding
+
+
+def estimate_tokens(text: str) -> int:
+    """Count tokens with tiktoken when available, else approximate at ~4 characters per token."""
+    if not text:
+        return 0
+    encoding = load_encoding()
+    if encoding is not None:
+        return len(encoding.encode(text, disallowed_special=()))
+    return len(text) // 4 + 1
+
+
+def mmr_select(query_vector: np.ndarray, doc_vectors: np.ndarray, k: int, lambda_mult: float = MMR_LAMBDA,
+               duplicate_threshold: float = DUPLICATE_THRESHOLD) -> List[int]:
+    """
+    Order documents by maximal marginal relevance and drop near-duplicates.
+
+    Each step picks the document maximizing
+    ``lambda * sim(query, d) - (1 - lambda) * max sim(d, selected)``.
+    Documents whose similarity to an already selected one exceeds
+    ``duplicate_threshold`` are discarded.
+
+    Args:
+        query_vector (np.ndarray): Query embedding.
+        doc_vectors (np.ndarray): One embedding per candidate document.
+        k (int): Maximum number of documents to select.
+        lambda_mult (float): Relevance/diversity trade-off in [0, 1].
+        duplicate_threshold (float): Cosine similarity above which documents count as duplicates.
+
+    Returns:
+        List[int]: Indices of the selected documents, in selection order.
+    """
+    vectors = doc_vectors / np.maximum(np.linalg.norm(doc_vectors, axis=1, keepdims=True), 1e-12)
+    query = query_vector / max(np.linalg.norm(query_vector), 1e-12)
+
+    relevance = vectors @ query
+    pairwise = vectors @ vectors.T
+
+    selected = []
+    redundancy = np.full(len(vectors), -np.inf)
+    remaining = np.ones(len(vectors), dtype=bool)
+
+    while remaining.any() and len(selected) < k:
+        penalty = np.where(np.isinf(redundancy), 0.0, redundancy)
+        scores = np.where(remaining, lambda_mult * relevance - (1 - lambda_mult) * penalty, -np.inf)
+        best = int(np.argmax(scores))
+
+        selected.append(best)
+        remaining[best] = False
+        redundancy = np.maximum(redundancy, pairwise[best])
+        remaining &= pairwise[best] < duplicate_threshold
+
+    return selected
+
+
+def best_span(text: str, query: str, max_tokens: int) -> str:
+    """
+    Trim ``text`` to the contiguous run of sentences that fits ``max_tokens``
+    and shares the most words with ``query``.
+    """
+    if estimate_tokens(text) <= max_tokens:
+        return text
+
+    sentences = [s for s in _SENTENCE_SPLIT.split(text) if s.strip()]
+    terms = set(_WORD.findall(query.lower()))
+    scores = [len(terms & set(_WORD.findall(s.lower()))) for s in sentences]
+    costs = [estimate_tokens(s) + 1 for s in sentences]
+
+    best = (-1, 0, 0)
+    start = score = cost = 0
+    for end in range(len(sentences)):
+        score += scores[end]
+        cost += costs[end]
+        while cost > max_tokens and start <= end:
+            score -= scores[start]
+            cost -= costs[start]
+            start += 1
+        if start <= end and score > best[0]:
+            best = (score, start, end + 1)
+
+    _, start, end = best
+    if end == 0:
+        # A single sentence longer than the limit: keep its head.
+        return sentences[0][: max_tokens * 4] + " …"
+
+    span = " ".join(sentences[start:end])
+    return ("… " if start > 0 else "") + span + (" …" if end < len(sentences) else "")
+
+
+def pack_documents(docs: List[dict], query: str, query_vector=None, top_k: int = None,
+                   token_budget: int = TOKEN_BUDGET, doc_token_limit: int = DOC_TOKEN_LIMIT) -> dict:
+    """
+    Deduplicate retrieved documents with MMR and pack them into a token budget.
+
+    Documents that carry an ``embedding`` are reordered and deduplicated with
+    MMR first. They are then added in order, each trimmed to its most
+    query-relevant span of at most ``doc_token_limit`` tokens, until the budget
+    is spent. Embeddings are removed from the returned documents.
+
+    Args:
+        docs (List[dict]): Retrieved documents (``text`` plus optional ``embedding``).
+        query (str): The user query, used to pick spans.
+        query_vector (optional): Query embedding for MMR.
+        top_k (int, optional): Maximum number of documents to keep.
+        token_budget (int): Total tokens allowed across all document texts.
+        doc_token_limit (int): Tokens allowed per document.
+
+    Returns:
+        dict: ``documents`` plus ``tokens_before``, ``tokens_after``,
+        ``tokens_saved`` and ``duplicates_removed``.
+    """
+    top_k = top_k or len(docs)
+    tokens_before = sum(estimate_tokens(doc.get("text") or "") for doc in docs)
+
+    ordered = docs
+    if query_vector is not None and docs and all(doc.get("embedding") is not None for doc in docs):
+        vectors = np.asarray([doc["embedding"] for doc in docs], dtype=np.float32)
+        ordered = [docs[i] for i in mmr_select(np.asarray(query_vector, dtype=np.float32), vectors, top_k)]
+    duplicates_removed = len(docs) - len(ordered)
+
+    packed = []
+    remaining = token_budget
+    for doc in ordered[:top_k]:
+        if remaining < MIN_DOC_TOKENS:
+            break
+        text = best_span(doc.get("text") or "", query, min(doc_token_limit, remaining))
+        remaining -= estimate_tokens(text)
+        packed.append({**{k: v for k, v in doc.items() if k != "embedding"}, "text": text})
+
+    tokens_after = token_budget - remaining
+    logging.info(f"Packed {len(packed)} documents into {tokens_after} tokens (saved {tokens_before - tokens_after}).")
+
+    return {
+        "documents": packed,
+        "tokens_before": tokens_before,
+        "tokens_after": tokens_after,
+        "tokens_saved": tokens_before - tokens_after,
+        "duplicates_removed": duplicates_removed,
+    }
@@ -1,10 +1,15 @@
 import os
 import logging
+from typing import List, Optional
 from dotenv import load_dotenv
 from langchain.tools import tool
+from concurrent.futures import ThreadPoolExecutor
 
-from azure.cosmos import CosmosClient
-from openai import OpenAI
+from agent.clients import clients
+from agent.tools.embeddings import embed_texts
+from agent.tools.keyword_index import get_keyword_index
+from agent.tools.local_index import get_local_index
+from agent.tools.postprocess import pack_documents
 
 azure_logger = logging.getLogger("azure.cosmos")
 azure_logger.setLevel(logging.WARNING)
@@ -22,60 +27,304 @@ COSMOS_KEY = os.getenv("COSMOS_KEY")
 EMBEDDINGS_MODEL = "text-embedding-3-small"
 DATABASE_NAME = "vectordb"
 CONTAINER_NAME = "vc_docs"
+TOP_K = int(os.getenv("RETRIEVER_TOP_K", 20))
+MAX_TOP_K = 50
+SNIPPET_CHARS = int(os.getenv("RETRIEVER_SNIPPET_CHARS", 300))
+RRF_K = 60
+VECTOR_BACKEND = os.getenv("VECTOR_BACKEND", "cosmos")
+COSMOS_PARTITION_KEY = os.getenv("COSMOS_PARTITION_KEY")
+RETRIEVER_MMR = os.getenv("RETRIEVER_MMR", "true").lower() == "true"
+RETRIEVER_HYBRID = os.getenv("RETRIEVER_HYBRID", "true").lower() == "true"
 
-openai_client = OpenAI()
-cosmos_client = CosmosClient(COSMOS_HOST, COSMOS_KEY)
+# Retrieval filters and the document metadata field each one applies to.
+FILTER_FIELDS = {
+    "sector": "sector",
+    "fund": "fund",
+    "doc_type": "doc_type",
+}
+DATE_FIELD = "date"
 
-db = cosmos_client.get_database_client(DATABASE_NAME)
-container = db.get_container_client(CONTAINER_NAME)
+def _cosmos_container():
+    from azure.cosmos import CosmosClient
 
-def vector_search(queries):
+    cosmos_client = CosmosClient(COSMOS_HOST, COSMOS_KEY)
+    db = cosmos_client.get_database_client(DATABASE_NAME)
+    return db.get_container_client(CONTAINER_NAME)
+
+# Always registered so ingestion can target Cosmos whatever VECTOR_BACKEND the
+# server uses; only warmed up when the retriever reads from it.
+clients.register("cosmos", _cosmos_container, warmup=VECTOR_BACKEND == "cosmos")
+
+def _cosmos_where(filters: dict):
     """
-    Performs a vector similarity search in Cosmos DB for a list of query strings.
+    Translate retrieval filters into a Cosmos WHERE clause and parameters.
 
     Args:
-        queries (List[str]): A list of search queries to be embedded and searched.
+        filters (dict): Any of sector, fund, doc_type, date_from, date_to.
 
     Returns:
-        List[dict]: A list of document dictionaries retrieved from the database, sorted by similarity score.
+        tuple: (where clause or "", query parameters)
     """
-    logging.info(f"Performing vector search for user query.")
-    results = []
+    clauses = []
+    parameters = []
 
-    response = openai_client.embeddings.create(
-            input=queries,
-            model=EMBEDDINGS_MODEL,
-        )
-    
-    embedding = response.data[0].embedding
-     
-    query = "SELECT TOP 20 c.id, c.text, c.metadata, VectorDistance(c.embedding, @query_vector) AS SimilarityScore FROM c ORDER BY VectorDistance(c.embedding, @query_vector)"
-    result = list(container.query_items(
+    for name, field in FILTER_FIELDS.items():
+        if filters.get(name):
+            clauses.append(f"c.metadata.{field} = @{name}")
+            parameters.append({"name": f"@{name}", "value": filters[name]})
+
+    if filters.get("date_from"):
+        clauses.append(f"c.metadata.{DATE_FIELD} >= @date_from")
+        parameters.append({"name": "@date_from", "value": filters["date_from"]})
+    if filters.get("date_to"):
+        clauses.append(f"c.metadata.{DATE_FIELD} <= @date_to")
+        parameters.append({"name": "@date_to", "value": filters["date_to"]})
+
+    return (" WHERE " + " AND ".join(clauses) if clauses else ""), parameters
+
+def _cosmos_vector_query(embedding, top_k=TOP_K, filters=None, snippet_chars=None, include_embeddings=False):
+    """
+    Run the Cosmos DB VectorDistance query for one query embedding.
+
+    Filters are pushed into the query. When the container's partition key
+    (COSMOS_PARTITION_KEY) is one of the filters the query is scoped to that
+    single partition instead of fanning out. With ``snippet_chars`` only the
+    first characters of each document are returned; ``include_embeddings``
+    also projects the stored document embedding (used for MMR).
+    """
+    filters = filters or {}
+    where, parameters = _cosmos_where(filters)
+    text = f"LEFT(c.text, {int(snippet_chars)}) AS text" if snippet_chars else "c.text"
+    if include_embeddings:
+        text += ", c.embedding"
+
+    query = f"SELECT TOP {int(top_k)} c.id, {text}, c.metadata, VectorDistance(c.embedding, @query_vector) AS SimilarityScore FROM c{where} ORDER BY VectorDistance(c.embedding, @query_vector)"
+
+    scope = {"enable_cross_partition_query": True}
+    if COSMOS_PARTITION_KEY and filters.get(COSMOS_PARTITION_KEY):
+        scope = {"partition_key": filters[COSMOS_PARTITION_KEY]}
+
+    return list(clients.get("cosmos").query_items(
         query=query,
         parameters=[
-            {"name": "@query_vector", "value": embedding}
-        ],
+            {"name": "@query_vector", "value": embedding.tolist()}
+        ] + parameters,
+        **scope
+    ))
+
+def _cosmos_fetch(ids, include_embeddings=False):
+    """Fetch full documents by id from Cosmos DB."""
+    embedding = ", c.embedding" if include_embeddings else ""
+    return list(clients.get("cosmos").query_items(
+        query=f"SELECT c.id, c.text, c.metadata{embedding} FROM c WHERE ARRAY_CONTAINS(@ids, c.id)",
+        parameters=[{"name": "@ids", "value": list(ids)}],
         enable_cross_partition_query=True
     ))
 
-    
+def _matches_filters(metadata: dict, filters: dict) -> bool:
+    """Local equivalent of the Cosmos WHERE clause built by _cosmos_where."""
+    for name, field in FILTER_FIELDS.items():
+        if filters.get(name) and metadata.get(field) != filters[name]:
+            return False
+    date = metadata.get(DATE_FIELD)
+    if filters.get("date_from") and (date is None or date < filters["date_from"]):
+        return False
+    if filters.get("date_to") and (date is None or date > filters["date_to"]):
+        return False
+    return True
+
+def _local_vector_query(embedding, top_k=TOP_K, filters=None, snippet_chars=None, include_embeddings=False):
+    """Run the same top-k similarity search against the local memory-mapped index."""
+    predicate = (lambda metadata: _matches_filters(metadata, filters)) if filters else None
+    docs = get_local_index().search(embedding, top_k=top_k, predicate=predicate, include_embeddings=include_embeddings)
+    if snippet_chars:
+        for doc in docs:
+            doc["text"] = (doc["text"] or "")[:snippet_chars]
+    return docs
+
+def _local_fetch(ids, include_embeddings=False):
+    return get_local_index().get(ids, include_embeddings=include_embeddings)
+
+VECTOR_BACKENDS = {
+    "cosmos": _cosmos_vector_query,
+    "local": _local_vector_query,
+}
+
+FETCH_BACKENDS = {
+    "cosmos": _cosmos_fetch,
+    "local": _local_fetch,
+}
+
+def reciprocal_rank_fusion(rankings, k: int = RRF_K):
+    """
+    Fuse several ranked document lists with reciprocal rank fusion.
+
+    Each document scores sum(1 / (k + rank)) over the lists it appears in, so
+    documents ranked well for several query phrasings rise to the top. The
+    highest SimilarityScore seen for a document is kept.
+
+    Args:
+        rankings (List[List[dict]]): Ranked result lists, best first.
+        k (int): RRF damping constant.
+
+    Returns:
+        List[dict]: Fused list, best first.
+    """
+    fused = {}
+    scores = {}
+
+    for ranking in rankings:
+        for rank, doc in enumerate(ranking, start=1):
+            doc_id = doc.get("id")
+            scores[doc_id] = scores.get(doc_id, 0.0) + 1.0 / (k + rank)
+            best = fused.get(doc_id)
+            if best is None or (doc.get("SimilarityScore") or 0) > (best.get("SimilarityScore") or 0):
+                fused[doc_id] = doc
+
+    return [fused[doc_id] for doc_id in sorted(scores, key=scores.get, reverse=True)]
+
+def vector_search(queries, top_k=TOP_K, filters=None, snippet_chars=None, include_embeddings=False, embeddings=None):
+    """
+    Performs a vector similarity search for a list of query strings against
+    the backend selected by VECTOR_BACKEND (``cosmos`` or ``local``).
+
+    All queries are embedded in one batched request (cached embeddings are
+    reused), the per-query searches run concurrently, and the rankings are
+    merged with reciprocal rank fusion.
+
+    Args:
+        queries (List[str]): A list of search queries to be embedded and searched.
+        top_k (int): Number of documents to return.
+        filters (dict, optional): Metadata/partition filters, see _cosmos_where.
+        snippet_chars (int, optional): Return only this many leading characters of each text.
+        include_embeddings (bool): Also return the stored document embeddings.
+        embeddings (np.ndarray, optional): The query embeddings, if the caller already computed them.
+
+    Returns:
+        List[dict]: A list of document dictionaries retrieved from the database, sorted by similarity score.
+    """
+    logging.info(f"Performing vector search for {len(queries)} queries.")
+
+    if embeddings is None:
+        embeddings = embed_texts(clients.get("openai"), queries, EMBEDDINGS_MODEL)
+    backend = VECTOR_BACKENDS[VECTOR_BACKEND]
+
+    def search(embedding):
+        return backend(embedding, top_k=top_k, filters=filters, snippet_chars=snippet_chars, include_embeddings=include_embeddings)
+
+    if len(embeddings) == 1:
+        rankings = [search(embeddings[0])]
+    else:
+        with ThreadPoolExecutor(max_workers=len(embeddings)) as pool:
+            rankings = list(pool.map(search, embeddings))
+
+    result = reciprocal_rank_fusion(rankings)[:top_k] if len(rankings) > 1 else rankings[0]
+
     logging.info(f"Vector search retrieved {len(result)} total documents across all queries.")
 
     return result
 
-def retriever(user_query : str):
+def keyword_search(user_query: str, top_k=TOP_K, filters=None, snippet_chars=None, include_embeddings=False):
+    """
+    Look the query up in the BM25 keyword index and fetch the matching documents.
+
+    Args:
+        user_query (str): The original query from the user.
+        top_k (int): Number of keyword hits to consider.
+        filters (dict, optional): Applied to the fetched documents' metadata.
+        snippet_chars (int, optional): Return only this many leading characters of each text.
+        include_embeddings (bool): Also return the stored document embeddings.
+
+    Returns:
+        tuple: (documents best first, whether the match is confident enough to skip vector search)
+    """
+    index = get_keyword_index(create=False)
+    if index is None:
+        return [], False
+
+    result = index.search(user_query, top_k=top_k)
+    if not result["hits"]:
+        return [], False
+
+    ids = [doc_id for doc_id, _, _ in result["hits"]]
+    confident = index.is_confident(result)
+    if confident:
+        # Only hits containing every query term answer an exact-name lookup.
+        ids = [doc_id for doc_id, _, matched in result["hits"] if matched == len(result["terms"])]
+
+    found = {doc["id"]: doc for doc in FETCH_BACKENDS[VECTOR_BACKEND](ids, include_embeddings=include_embeddings)}
+    docs = [found[doc_id] for doc_id in ids if doc_id in found]
+    if filters:
+        docs = [doc for doc in docs if _matches_filters(doc.get("metadata") or {}, filters)]
+    if snippet_chars:
+        for doc in docs:
+            doc["text"] = (doc.get("text") or "")[:snippet_chars]
+
+    return docs, confident and bool(docs)
+
+def retriever(
+    user_query : str,
+    queries : Optional[List[str]] = None,
+    filters : Optional[dict] = None,
+    top_k : Optional[int] = None,
+    snippets_only : bool = False,
+):
     """
     Orchestrates the entire retrieval process from a user query to a final list of documents.
 
     Args:
         user_query (str): The original query from the user.
+        queries (List[str], optional): Alternative phrasings retrieved in the same call; rankings are fused.
+        filters (dict, optional): sector, fund, doc_type, date_from, date_to.
+        top_k (int, optional): Number of documents to return (default RETRIEVER_TOP_K, max 50).
+        snippets_only (bool): Return ids and short snippets; full text can be fetched with fetch_documents.
+
+    With RETRIEVER_HYBRID the query is first looked up in the BM25 keyword
+    index. A confident exact-name match is answered from the keyword hits
+    without embedding the query; otherwise keyword and vector rankings are
+    fused with reciprocal rank fusion.
+
+    Near-duplicate chunks are removed with MMR over the stored document
+    embeddings (RETRIEVER_MMR), and the remaining texts are trimmed to their
+    most relevant spans to fit RETRIEVER_TOKEN_BUDGET.
 
     Returns:
         List[dict]: The final, ranked list of retrieved documents to be used as context.
     """
 
-    docs = vector_search(queries=[user_query])
-    
+    all_queries = [user_query] + [q for q in (queries or []) if q and q != user_query]
+    top_k = max(1, min(int(top_k or TOP_K), MAX_TOP_K))
+    snippet_chars = SNIPPET_CHARS if snippets_only else None
+
+    keyword_docs, confident = [], False
+    keywords = get_keyword_index(create=False) if RETRIEVER_HYBRID else None
+    if keywords is not None and len(keywords):
+        keyword_docs, confident = keyword_search(
+            user_query, top_k=top_k, filters=filters, snippet_chars=snippet_chars, include_embeddings=RETRIEVER_MMR,
+        )
+
+    if confident:
+        logging.info(f"Confident keyword match for '{user_query}', skipping vector search.")
+        docs = keyword_docs[:top_k]
+        query_vector = None
+    else:
+        # Embedded here once, so MMR below reuses the user query's vector.
+        embeddings = embed_texts(clients.get("openai"), all_queries, EMBEDDINGS_MODEL)
+        docs = vector_search(
+            queries=all_queries,
+            top_k=top_k,
+            filters=filters,
+            snippet_chars=snippet_chars,
+            include_embeddings=RETRIEVER_MMR,
+            embeddings=embeddings,
+        )
+        if keyword_docs:
+            docs = reciprocal_rank_fusion([docs, keyword_docs])[:top_k]
+
+        query_vector = embeddings[0] if RETRIEVER_MMR else None
+    packed = pack_documents(docs, user_query, query_vector, top_k=top_k)
+    docs = packed["documents"]
+
     logging.info(f"Retriever finished. Sending back {len(docs)} documents to LLM.")
 
     formatted = [
@@ -90,5 +339,33 @@ def retriever(user_query : str):
 
     return {
         "result_count": len(formatted),
-        "documents": formatted
+        "documents": formatted,
+        "duplicates_removed": packed["duplicates_removed"],
+        "tokens_saved": packed["tokens_saved"],
+    }
+
+
+def fetch_documents(ids : List[str]):
+    """
+    Fetch the full text of knowledge-base documents by id, typically the
+    subset of a snippets_only retrieval the model actually wants to read.
+
+    Args:
+        ids (List[str]): Document ids returned by the retriever.
+
+    Returns:
+        dict: The documents found, in the requested order.
+    """
+    found = {doc["id"]: doc for doc in FETCH_BACKENDS[VECTOR_BACKEND](ids)}
+    documents = [
+        {"id": doc_id, "text": found[doc_id].get("text"), "metadata": found[doc_id].get("metadata")}
+        for doc_id in ids
+        if doc_id in found
+    ]
+
+    logging.info(f"Fetched {len(documents)} of {len(ids)} requested documents.")
+
+    return {
+        "result_count": len(documents),
+        "documents": documents
     }
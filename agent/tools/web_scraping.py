@@ -1,24 +1,75 @@
 import os
-from typing import List, Dict, Any
+from typing import List, Dict, Any, Optional
 import logging
 from dotenv import load_dotenv
-from tavily import TavilyClient
 import re
+import multiprocessing
+from concurrent.futures import ProcessPoolExecutor
+
+from agent.clients import clients
+from agent.tools.cache import get_tool_cache, tool_cache_key, canonical_url
 
 load_dotenv()
 
-TAVILY_API_KEY = os.getenv("TAVILY_API_KEY")
+IMAGE_LINK = re.compile(r'\!\[.*?\]\(.*?\)')
+MARKDOWN_LINK = re.compile(r'\[.*?\]\(.*?\)')
+SYMBOLS = re.compile(r'[^\w\s.,:/\-()]+')
+
+# Promotional / navigation lines cut from the match to the end of the line.
+# Extra patterns can be added, one regex per line, in SCRAPE_NOISE_PATTERNS_FILE.
+NOISE_PATTERNS = [
+    r"Black Friday sale is live now.*",
+    r"Use this code.*",
+    r"Try Bitscale Now.*",
+    r"Need more information.*",
+    r"Back to Directory.*"
+]
+
+SCRAPE_CLEAN_WORKERS = int(os.getenv("SCRAPE_CLEAN_WORKERS", min(4, os.cpu_count() or 1)))
+SCRAPE_PARALLEL_MIN_BYTES = int(os.getenv("SCRAPE_PARALLEL_MIN_BYTES", 512 * 1024))
+
+_clean_pool = None
+
+SCRAPE_NOISE_PATTERNS_FILE = os.getenv("SCRAPE_NOISE_PATTERNS_FILE")
+if SCRAPE_NOISE_PATTERNS_FILE:
+    with open(SCRAPE_NOISE_PATTERNS_FILE, encoding="utf-8") as f:
+        NOISE_PATTERNS += [line.rstrip("\n") for line in f if line.strip()]
+
 
-if not TAVILY_API_KEY:
-    raise ValueError("TAVILY_API_KEY enviorment varaible not set.")
+# Characters re.IGNORECASE matches to an ASCII letter that str.lower() does not map to it.
+_IGNORECASE_FOLD = str.maketrans({"\u017f": "s", "\u0131": "i", "\u0130": "i", "\u212a": "k"})
+_REGEX_METACHARACTERS = set(".^$*+?{}[]\\|()")
 
-try:
-    tavily_client = TavilyClient(TAVILY_API_KEY)
-except Exception as e:
-    logging.error(f"Failed to initialize API clients : {e}")
-    raise
 
-def clean_webpage_text(text: str) -> str:
+def compile_noise_patterns(patterns: List[str]) -> tuple:
+    """
+    Compile noise patterns for clean_webpage_text.
+
+    Patterns of the form ``<ASCII phrase>.*`` also get a lowercase phrase used
+    as a cheap substring prefilter; any other pattern is prefiltered with its
+    own regex.
+
+    Returns:
+        tuple: (compiled patterns in order, lowercase phrases, regex prefilters)
+    """
+    compiled = [re.compile(p, re.IGNORECASE) for p in patterns]
+    phrases = []
+    prefilters = []
+
+    for p, regex in zip(patterns, compiled):
+        phrase = p[:-2] if p.endswith(".*") else p
+        if phrase and phrase.isascii() and not _REGEX_METACHARACTERS.intersection(phrase):
+            phrases.append(phrase.lower())
+        else:
+            prefilters.append(regex)
+
+    return compiled, phrases, prefilters
+
+
+NOISE = compile_noise_patterns(NOISE_PATTERNS)
+
+
+def clean_webpage_text(text: str, noise=NOISE) -> str:
     """
     Cleans raw webpage text extracted from Tavily by removing:
     - duplicate lines
@@ -28,32 +79,42 @@ def clean_webpage_text(text: str) -> str:
     - image alt-text artifacts
     - extra whitespace
 
+    None of the substitutions cross a newline, so the page is processed in a
+    single pass line by line: each line goes through the link, noise and
+    symbol substitutions in order and is then filtered and deduplicated.
+    Link substitutions are skipped when the page has no links, noise
+    substitutions when a lowercase phrase check shows the line cannot match,
+    and repeated raw lines are dropped before any regex runs.
+
+    Args:
+        text (str): Raw page content.
+        noise (tuple): Patterns from compile_noise_patterns (default NOISE_PATTERNS).
+
     Returns a cleaner, human-readable string.
     """
 
-    text = re.sub(r'\!\[.*?\]\(.*?\)', '', text)
-    text = re.sub(r'\[.*?\]\(.*?\)', '', text)  
+    noise_patterns, noise_phrases, noise_prefilters = noise
+    strip_links = "](" in text
 
-    patterns_to_remove = [
-        r"Black Friday sale is live now.*", 
-        r"Use this code.*",
-        r"Try Bitscale Now.*",
-        r"Need more information.*",
-        r"Back to Directory.*"
-    ]
-
-    for p in patterns_to_remove:
-        text = re.sub(p, '', text, flags=re.IGNORECASE)
+    cleaned_lines = []
+    seen = set()
+    seen_raw = set()
 
-    text = re.sub(r'[^\w\s.,:/\-()]+', '', text)
+    for line in text.split("\n"):
+        # An identical raw line cleans to the same result, which is either a duplicate or filtered out.
+        if line in seen_raw:
+            continue
+        seen_raw.add(line)
 
-    lines = text.split("\n")
+        if strip_links:
+            line = MARKDOWN_LINK.sub('', IMAGE_LINK.sub('', line))
 
-    cleaned_lines = []
-    seen = set()
+        folded = (line if line.isascii() else line.translate(_IGNORECASE_FOLD)).lower()
+        if any(phrase in folded for phrase in noise_phrases) or any(p.search(line) for p in noise_prefilters):
+            for p in noise_patterns:
+                line = p.sub('', line)
 
-    for line in lines:
-        line = line.strip()
+        line = SYMBOLS.sub('', line).strip()
 
         if not line or len(line) < 3:
             continue
@@ -70,40 +131,88 @@ def clean_webpage_text(text: str) -> str:
     return "\n".join(cleaned_lines)
 
 
-def web_scrap(url : str) -> List[Dict[str, Any]]:
+def _clean_pages(pages: List[str]) -> List[str]:
+    """
+    Clean several raw pages, in parallel worker processes when it pays off.
+
+    Cleaning is CPU-bound pure Python, so threads would serialize on the
+    GIL; pages are sent to a small process pool instead once there are at
+    least two of them totalling SCRAPE_PARALLEL_MIN_BYTES.
+    """
+    global _clean_pool
+
+    if len(pages) < 2 or SCRAPE_CLEAN_WORKERS < 2 or sum(len(page) for page in pages) < SCRAPE_PARALLEL_MIN_BYTES:
+        return [clean_webpage_text(page) for page in pages]
+
+    try:
+        if _clean_pool is None:
+            _clean_pool = ProcessPoolExecutor(SCRAPE_CLEAN_WORKERS, mp_context=multiprocessing.get_context("spawn"))
+        return list(_clean_pool.map(clean_webpage_text, pages))
+    except Exception as e:
+        logging.warning(f"Parallel page cleaning failed, cleaning inline : {e}")
+        _clean_pool = None
+        return [clean_webpage_text(page) for page in pages]
+
+
+def web_scrap(urls : Optional[List[str]] = None, url : Optional[str] = None) -> Dict[str, Any]:
     """
-    Performs a web scrap for a given url
+    Performs a web scrap for one or more urls.
+
+    Already-cached pages are served locally, the rest are fetched in a single
+    batched Tavily extract call and cleaned. A URL that fails does not fail
+    the others.
+
     Args:
-        url: The user's input url
+        urls: The urls to scrape.
+        url: A single url (kept for callers using the original schema).
 
     Return:
-        search results.
+        dict: ``results`` ({url, content}, in request order) and ``failed`` ({url, error}).
     """
 
-    clean_results = []
+    requested = list(dict.fromkeys(u for u in (urls or []) + ([url] if url else []) if u))
+    cache = get_tool_cache("web_scrap")
+    keys = {u: tool_cache_key("web_scrap", {"url": u}) for u in requested}
 
-    try:
-        extraction  = tavily_client.extract(
-            urls=url,
-            extract_dept = "advanced",
-            include_images=False,
-            include_favicon=False
-            )
-        
-        raw = extraction["results"][0].get("raw_content", "")
-        
+    contents = {}
+    failed = []
+    for u in requested:
+        cached = cache.get(keys[u])
+        if cached is not None:
+            contents[u] = cached
+
+    missing = [u for u in requested if u not in contents]
+    if missing:
+        logging.info(f"Extracting {len(missing)} urls ({len(requested) - len(missing)} served from cache).")
         try:
-            clean_results = clean_webpage_text(raw)
-        except Exception as e:
-            clean_results = extraction
+            extraction  = clients.get("tavily").extract(
+                urls=missing,
+                extract_dept = "advanced",
+                include_images=False,
+                include_favicon=False
+                )
+
+            by_url = {canonical_url(r.get("url", "")): r.get("raw_content") or "" for r in extraction.get("results", [])}
+            errors = {canonical_url(r.get("url", "")): r.get("error") for r in extraction.get("failed_results", [])}
+
+            fetched = [u for u in missing if canonical_url(u) in by_url]
+            for u, content in zip(fetched, _clean_pages([by_url[canonical_url(u)] for u in fetched])):
+                if content:
+                    contents[u] = content
+                    cache.set(keys[u], content)
+                else:
+                    failed.append({"url": u, "error": "No content extracted"})
+
+            failed += [
+                {"url": u, "error": errors.get(canonical_url(u)) or "No content extracted"}
+                for u in missing if canonical_url(u) not in by_url
+            ]
 
-    except Exception as e:
-        logging.error(f"Extraction failed for url '{url}' : {e}")
+        except Exception as e:
+            logging.error(f"Extraction failed for urls {missing} : {e}")
+            failed += [{"url": u, "error": str(e)} for u in missing]
 
-    if not clean_results:
-        logging.info("No search result found for the url")
-        return []
-    
-    logging.info(f"Returning {len(clean_results)} final results from web extract.")
-    return clean_results
+    results = [{"url": u, "content": contents[u]} for u in requested if u in contents]
 
+    logging.info(f"Returning {len(results)} pages from web extract, {len(failed)} failed.")
+    return {"results": results, "failed": failed}
@@ -1,21 +1,15 @@
 import os
-from typing import List, Dict, Any
+import hashlib
+from typing import List, Dict, Any, Tuple
 import logging
 from dotenv import load_dotenv
-from tavily import TavilyClient
 
-load_dotenv()
-
-TAVILY_API_KEY = os.getenv("TAVILY_API_KEY")
+from agent.clients import clients
+from agent.tools.cache import canonical_url, normalize_text
 
-if not TAVILY_API_KEY:
-    raise ValueError("TAVILY_API_KEY enviorment varaible not set.")
+load_dotenv()
 
-try:
-    tavily_client = TavilyClient(TAVILY_API_KEY)
-except Exception as e:
-    logging.error(f"Failed to initialize API clients : {e}")
-    raise
+WEB_SEARCH_RESULT_MAX_CHARS = int(os.getenv("WEB_SEARCH_RESULT_MAX_CHARS", 1200))
 
 
 def web_search(query : str) -> List[Dict[str, Any]]:
@@ -31,7 +25,7 @@ def web_search(query : str) -> List[Dict[str, Any]]:
     search_result = []
 
     try:
-        search_result  = tavily_client.search(
+        search_result  = clients.get("tavily").search(
         query = query,
         topic = "general",
         search_depth = "advanced",
@@ -52,3 +46,51 @@ def web_search(query : str) -> List[Dict[str, Any]]:
     logging.info(f"Returning {len(search_result)} final results from web search.")
     return search_result
 
+
+def compact_search_results(search_result, seen: set) -> Tuple[Dict[str, Any], List[str]]:
+    """
+    Reduce a Tavily search response to what the model reads, without repeats.
+
+    Keeps the answer and each result's title, url, content and score, caps
+    the content at WEB_SEARCH_RESULT_MAX_CHARS and drops results whose URL or
+    content was already returned earlier in the session.
+
+    Args:
+        search_result: The raw web_search result.
+        seen (set): Keys (canonical URLs and content hashes) already sent in this session.
+
+    Returns:
+        tuple: (compacted result, keys of the results kept)
+    """
+    if not isinstance(search_result, dict) or "results" not in search_result:
+        return search_result, []
+
+    results = []
+    new_keys = []
+    omitted = 0
+
+    for item in search_result.get("results") or []:
+        content = item.get("content") or ""
+        url_key = "url:" + canonical_url(item.get("url") or "")
+        content_key = "content:" + hashlib.sha256(normalize_text(content).encode()).hexdigest()[:16]
+
+        if url_key in seen or content_key in seen:
+            omitted += 1
+            continue
+
+        seen.update((url_key, content_key))
+        new_keys += [url_key, content_key]
+        results.append({
+            "title": item.get("title"),
+            "url": item.get("url"),
+            "content": content[:WEB_SEARCH_RESULT_MAX_CHARS],
+            "score": round(item["score"], 3) if isinstance(item.get("score"), (int, float)) else item.get("score"),
+        })
+
+    compacted = {"query": search_result.get("query"), "results": results}
+    if search_result.get("answer"):
+        compacted["answer"] = search_result["answer"]
+    if omitted:
+        compacted["omitted_already_seen"] = omitted
+
+    return compacted, new_keys
@@ -1,11 +1,29 @@
+import os
+import json
+import time
+import uuid
+import asyncio
 import logging
 from fastapi import FastAPI
+from fastapi.responses import StreamingResponse, JSONResponse
 from pydantic import BaseModel
 from fastapi.middleware.cors import CORSMiddleware
 from typing import Optional, List, Dict
+from contextlib import asynccontextmanager
 from fastapi import Header, HTTPException, status
 
-from agent.agent import graph
+from agent.agent import get_graph, message_cache_stats, tool_executor
+from agent.clients import openai_pool, clients
+from agent.metrics import llm_usage
+from agent.routing import routing_stats
+from agent.tools.cache import cache_stats, tool_flights
+from agent.tools.embeddings import embedding_cache
+from agent.tools.keyword_index import get_keyword_index
+from agent.tools.postprocess import load_encoding
+
+BATCH_DEFAULT_CONCURRENCY = int(os.getenv("BATCH_DEFAULT_CONCURRENCY", 8))
+BATCH_MAX_CONCURRENCY = int(os.getenv("BATCH_MAX_CONCURRENCY", 64))
+BATCH_ITEM_TIMEOUT = float(os.getenv("BATCH_ITEM_TIMEOUT", 120))
 
 logger = logging.getLogger("backend")
 logger.setLevel(logging.INFO)
@@ -19,7 +37,20 @@ if not logger.handlers:
     logger.addHandler(handler)
 
 
-app = FastAPI()
+@asynccontextmanager
+async def lifespan(app: FastAPI):
+    """Application lifespan: warm up shared clients on startup, release pooled upstream clients and tool threads on shutdown."""
+    logger.info("Warming up shared clients.")
+    await asyncio.to_thread(clients.warmup)
+    await asyncio.to_thread(load_encoding)
+    await asyncio.to_thread(get_graph)
+    yield
+    logger.info("Closing pooled OpenAI clients.")
+    await openai_pool.aclose()
+    tool_executor.shutdown(wait=False, cancel_futures=True)
+
+
+app = FastAPI(lifespan=lifespan)
 
 app.add_middleware(
     CORSMiddleware,
@@ -36,6 +67,9 @@ class ChatRequest(BaseModel):
     session_id: Optional[str] = None
     tools: List[Dict]
     tool_results: Optional[List[Dict]] = None
+    mode: str = "chat"
+    company: Optional[str] = None
+    market: Optional[str] = None
 
 
 class ChatResponse(BaseModel):
@@ -45,73 +79,117 @@ class ChatResponse(BaseModel):
     tools_used: List[str]
     tool_call_plan: Optional[List[Dict]] = None
     response: Optional[str] = None
+    evaluation: Optional[Dict] = None
 
 
-@app.post("/chat")
-async def chat(request: ChatRequest, openai_api_key: str = Header(None, convert_underscores=False, alias="openai_api_key")):
-    """
-    Primary chat endpoint for interacting with the agent.
+class BatchChatRequest(BaseModel):
+    """Batch request: every pitch is evaluated in its own session over the agent graph."""
+    pitches: List[str]
+    tools: List[Dict] = []
+    instruction: str = "Evaluate the following startup pitch."
+    mode: str = "chat"
+    concurrency: int = BATCH_DEFAULT_CONCURRENCY
+    item_timeout: float = BATCH_ITEM_TIMEOUT
 
-    - Accepts user messages, tool definitions, and tool results.
-    - Invokes the LangGraph state machine using the provided session_id.
-    - Returns either:
-        1. A final LLM response, or
-        2. Tool call instructions for the client to execute.
+
+def build_state(request: ChatRequest) -> dict:
+    """
+    Translate an incoming ChatRequest into the graph input state.
 
     Args:
         request (ChatRequest): The incoming POST body.
 
     Returns:
-        ChatResponse: The completed response or tool call directives.
+        dict: Partial AgentState to feed into the graph.
     """
-
-    logger.info("Received /chat request.")
-    logger.debug(f"Raw request body: {request.model_dump()}")
-
     if request.query is not None:
         logger.info("Constructing new state with user query.")
         state = {
             "query": request.query,
             "messages": [{"role": "user", "content": request.query}],
             "external_tools": request.tools,
-            "tool_results": request.tool_results
+            "tool_results": request.tool_results,
+            "mode": request.mode,
+            "company": request.company,
+            "market": request.market,
+            "evaluation": None,
         }
     else:
         logger.info("Constructing state without user message (tool result follow-up).")
         state = {
             "query": request.query,
             "external_tools": request.tools,
-            "tool_results": request.tool_results
+            "tool_results": request.tool_results,
+            "mode": request.mode,
+            "evaluation": None,
         }
 
     logger.debug(f"Final constructed state: {state}")
+    return state
+
+
+def build_chat_response(results: dict, session_id: str) -> ChatResponse:
+    """
+    Convert the final graph state into the public ChatResponse payload.
+
+    Args:
+        results (dict): Graph state values after the run finished.
+        session_id (str): Session the run belongs to.
+
+    Returns:
+        ChatResponse: The completed response or tool call directives.
+    """
+    if results.get('response') is not None:
+        logger.info("Returning final LLM response to client.")
+        return ChatResponse(
+            status="completed",
+            session_id=session_id,
+            response=results['response'],
+            tools_used=[],
+            evaluation=results.get('evaluation'),
+        )
+
+    logger.info("Returning pending tool call plan to client.")
+    return ChatResponse(
+        status="tool_calls_pending",
+        session_id=session_id,
+        tools_used=results["tools_used"],
+        tool_call_plan=results["tool_call_plan"],
+    )
+
+
+@app.post("/chat")
+async def chat(request: ChatRequest, openai_api_key: str = Header(None, convert_underscores=False, alias="openai_api_key")):
+    """
+    Primary chat endpoint for interacting with the agent.
+
+    - Accepts user messages, tool definitions, and tool results.
+    - Invokes the LangGraph state machine using the provided session_id.
+    - Returns either:
+        1. A final LLM response, or
+        2. Tool call instructions for the client to execute.
+
+    Args:
+        request (ChatRequest): The incoming POST body.
+
+    Returns:
+        ChatResponse: The completed response or tool call directives.
+    """
+
+    logger.info("Received /chat request.")
+    logger.debug(f"Raw request body: {request.model_dump()}")
+
+    state = build_state(request)
 
     config = {"configurable": {"thread_id": request.session_id, "api_key" : f"{openai_api_key}"}}
     logger.info(f"Invoking LangGraph for session: {request.session_id}")
 
     try:
-        results = graph.invoke(state, config)
+        results = await get_graph().ainvoke(state, config)
         logger.info("Graph invocation completed.")
         logger.debug(f"Graph returned: {results}")
 
-
-        if results.get('response') is not None:
-            logger.info("Returning final LLM response to client.")
-            return ChatResponse(
-                status="completed",
-                session_id=request.session_id,
-                response=results['response'],
-                tools_used=[]
-            )
-
-
-        logger.info("Returning pending tool call plan to client.")
-        return ChatResponse(
-            status="tool_calls_pending",
-            session_id=request.session_id,
-            tools_used=results["tools_used"],
-            tool_call_plan=results["tool_call_plan"],
-        )
+        return build_chat_response(results, request.session_id)
 
     except Exception as e:
         logger.exception("Error occurred while processing /chat request.")
@@ -119,3 +197,187 @@ async def chat(request: ChatRequest, openai_api_key: str = Header(None, convert_
             status_code=status.HTTP_500_INTERNAL_SERVER_ERROR,
             detail=str(e)
         )
+
+
+def sse_event(event: str, data) -> str:
+    """Format a single server-sent event frame."""
+    return f"event: {event}\ndata: {json.dumps(data)}\n\n"
+
+
+@app.post("/chat/stream")
+async def chat_stream(request: ChatRequest, openai_api_key: str = Header(None, convert_underscores=False, alias="openai_api_key")):
+    """
+    Streaming variant of /chat using server-sent events.
+
+    Emits, in order of occurrence:
+        - ``node`` events when a graph node starts or finishes,
+        - ``tool`` events when an internal tool starts or finishes,
+        - ``token`` events carrying LLM content deltas from reasoning_node,
+        - a single ``final`` event carrying the same payload /chat returns,
+          or an ``error`` event if the run failed.
+
+    Args:
+        request (ChatRequest): The incoming POST body.
+
+    Returns:
+        StreamingResponse: A text/event-stream response.
+    """
+
+    logger.info("Received /chat/stream request.")
+    logger.debug(f"Raw request body: {request.model_dump()}")
+
+    state = build_state(request)
+    config = {"configurable": {
+        "thread_id": request.session_id,
+        "api_key": f"{openai_api_key}",
+        "stream_tokens": True,
+    }}
+
+    async def events():
+        try:
+            async for mode, chunk in get_graph().astream(state, config, stream_mode=["custom", "tasks"]):
+                if mode == "custom":
+                    yield sse_event(chunk.pop("event"), chunk)
+                else:
+                    node_status = "finished" if "result" in chunk else "started"
+                    yield sse_event("node", {"name": chunk["name"], "status": node_status})
+
+            snapshot = await get_graph().aget_state(config)
+            final = build_chat_response(snapshot.values, request.session_id)
+            yield sse_event("final", final.model_dump())
+
+        except Exception as e:
+            logger.exception("Error occurred while processing /chat/stream request.")
+            yield sse_event("error", {"detail": str(e)})
+
+    logger.info(f"Streaming LangGraph run for session: {request.session_id}")
+    return StreamingResponse(
+        events(),
+        media_type="text/event-stream",
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
+
+@app.get("/ready")
+async def ready():
+    """
+    Readiness probe: succeeds once startup warmup has run and every warmed
+    client initialized.
+
+    Returns:
+        JSONResponse: Per-client status, with HTTP 503 while not ready.
+    """
+    client_status = clients.status()
+    is_ready = clients.warmed_up and not any(s.startswith("error") for s in client_status.values())
+    return JSONResponse(
+        {"ready": is_ready, "clients": client_status},
+        status_code=status.HTTP_200_OK if is_ready else status.HTTP_503_SERVICE_UNAVAILABLE,
+    )
+
+
+@app.get("/metrics")
+async def metrics():
+    """
+    Expose in-process runtime counters for the agent.
+
+    Returns:
+        dict: Counters grouped by component.
+    """
+    keyword_index = get_keyword_index(create=False)
+    return {
+        "openai_client_pool": openai_pool.stats(),
+        "llm_usage": llm_usage.stats(),
+        "model_routing": routing_stats(),
+        "sessions": clients.get("checkpointer").stats(),
+        "message_cache": message_cache_stats(),
+        "tool_cache": cache_stats(),
+        "tool_single_flight": tool_flights.stats(),
+        "embedding_cache": embedding_cache.stats(),
+        "keyword_index": keyword_index.stats() if keyword_index is not None else None,
+    }
+
+
+@app.post("/chat/batch")
+async def chat_batch(request: BatchChatRequest, openai_api_key: str = Header(None, convert_underscores=False, alias="openai_api_key")):
+    """
+    Evaluate many pitches through the agent graph with bounded concurrency.
+
+    Each pitch runs as an independent session (``<batch_id>-<index>``) on the
+    same graph /chat uses, with at most ``concurrency`` runs in flight and a
+    per-item timeout. Results are streamed back as newline-delimited JSON in
+    completion order:
+
+        - one ``item`` line per pitch with its ChatResponse, or the error/timeout,
+        - a final ``summary`` line with counts, wall time and throughput.
+
+    Args:
+        request (BatchChatRequest): The pitches and batch settings.
+
+    Returns:
+        StreamingResponse: An application/x-ndjson response.
+    """
+
+    logger.info(f"Received /chat/batch request with {len(request.pitches)} pitches.")
+
+    batch_id = str(uuid.uuid4())
+    concurrency = max(1, min(request.concurrency, BATCH_MAX_CONCURRENCY))
+    semaphore = asyncio.Semaphore(concurrency)
+
+    async def run_item(index: int, pitch: str) -> dict:
+        session_id = f"{batch_id}-{index}"
+        # The evaluate fast path scores the pitch text itself.
+        item_request = ChatRequest(
+            query=pitch if request.mode == "evaluate" else f"{request.instruction}\n\n{pitch}",
+            mode=request.mode,
+            session_id=session_id,
+            tools=request.tools,
+        )
+        config = {"configurable": {"thread_id": session_id, "api_key": f"{openai_api_key}"}}
+
+        async with semaphore:
+            start = time.perf_counter()
+            try:
+                results = await asyncio.wait_for(
+                    get_graph().ainvoke(build_state(item_request), config),
+                    timeout=request.item_timeout,
+                )
+                outcome = {"status": "ok", "result": build_chat_response(results, session_id).model_dump()}
+            except asyncio.TimeoutError:
+                logger.warning(f"Batch item {session_id} timed out after {request.item_timeout}s.")
+                outcome = {"status": "timeout", "error": f"Timed out after {request.item_timeout}s"}
+            except Exception as e:
+                logger.exception(f"Batch item {session_id} failed.")
+                outcome = {"status": "error", "error": str(e)}
+
+        return {"event": "item", "index": index, "session_id": session_id, **outcome, "elapsed": time.perf_counter() - start}
+
+    async def results():
+        start = time.perf_counter()
+        counts = {"ok": 0, "error": 0, "timeout": 0}
+        tasks = [asyncio.create_task(run_item(i, pitch)) for i, pitch in enumerate(request.pitches)]
+
+        try:
+            for next_done in asyncio.as_completed(tasks):
+                item = await next_done
+                counts[item["status"]] += 1
+                yield json.dumps(item) + "\n"
+        finally:
+            for task in tasks:
+                task.cancel()
+
+        elapsed = time.perf_counter() - start
+        summary = {
+            "event": "summary",
+            "batch_id": batch_id,
+            "total": len(tasks),
+            "completed": counts["ok"],
+            "failed": counts["error"],
+            "timed_out": counts["timeout"],
+            "concurrency": concurrency,
+            "elapsed": elapsed,
+            "throughput": len(tasks) / elapsed if elapsed else 0.0,
+        }
+        logger.info(f"Batch {batch_id} finished: {summary}")
+        yield json.dumps(summary) + "\n"
+
+    return StreamingResponse(results(), media_type="application/x-ndjson")
@@ -0,0 +1,96 @@
+"""
+Throughput of the /chat execution path as concurrency grows.
+
+Runs ``graph.ainvoke`` against a local stub model server with a fixed
+per-completion latency. With a fully async path, throughput should scale
+roughly linearly with concurrency until the stub or the event loop saturates;
+a blocking call anywhere on the path flattens the curve at ~1/latency.
+
+Usage:
+    python -m benchmarks.async_throughput --latency 0.2 --levels 1 8 32 64
+"""
+import os
+import math
+import time
+import uuid
+import asyncio
+import argparse
+import statistics
+
+from benchmarks.stub_openai import create_app, serve_in_background
+
+
+def percentile(sorted_values: list, q: float) -> float:
+    """Nearest-rank percentile (0 < q <= 100) of an ascending list."""
+    rank = max(math.ceil(q / 100 * len(sorted_values)), 1)
+    return sorted_values[rank - 1]
+
+
+async def run_level(graph, concurrency: int, total: int) -> dict:
+    """
+    Fire ``total`` single-turn chats with at most ``concurrency`` in flight.
+
+    Args:
+        graph: Compiled agent graph.
+        concurrency (int): Maximum number of sessions in flight.
+        total (int): Number of chats to run.
+
+    Returns:
+        dict: Throughput and latency percentiles for this level.
+    """
+    semaphore = asyncio.Semaphore(concurrency)
+    latencies = []
+
+    async def one_chat():
+        async with semaphore:
+            state = {
+                "query": "ping",
+                "messages": [{"role": "user", "content": "ping"}],
+                "external_tools": [],
+                "tool_results": None,
+            }
+            config = {"configurable": {"thread_id": str(uuid.uuid4()), "api_key": "stub"}}
+            start = time.perf_counter()
+            await graph.ainvoke(state, config)
+            latencies.append(time.perf_counter() - start)
+
+    start = time.perf_counter()
+    await asyncio.gather(*(one_chat() for _ in range(total)))
+    elapsed = time.perf_counter() - start
+
+    latencies.sort()
+    return {
+        "concurrency": concurrency,
+        "requests": total,
+        "throughput": total / elapsed,
+        "p50": statistics.median(latencies),
+        "p95": percentile(latencies, 95),
+    }
+
+
+async def main(args):
+    from agent.agent import get_graph
+
+    print(f"{'concurrency':>11} {'requests':>8} {'req/s':>8} {'p50 (s)':>8} {'p95 (s)':>8}")
+    for level in args.levels:
+        total = max(level * args.rounds, args.rounds)
+        row = await run_level(get_graph(), level, total)
+        print(
+            f"{row['concurrency']:>11} {row['requests']:>8} {row['throughput']:>8.1f} "
+            f"{row['p50']:>8.3f} {row['p95']:>8.3f}"
+        )
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.2, help="Stub completion latency in seconds.")
+    parser.add_argument("--levels", type=int, nargs="+", default=[1, 8, 32, 64])
+    parser.add_argument("--rounds", type=int, default=4, help="Chats per unit of concurrency.")
+    parser.add_argument("--port", type=int, default=8765)
+    args = parser.parse_args()
+
+    serve_in_background(create_app(latency_s=args.latency), args.port)
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{args.port}/v1"
+    os.environ.setdefault("TAVILY_API_KEY", "stub")
+
+    asyncio.run(main(args))
@@ -0,0 +1,162 @@
+"""
+Throughput and output equivalence of clean_webpage_text.
+
+Compares the single-pass cleaner in agent.tools.web_scraping with the
+original multi-pass implementation (kept below as ``legacy_clean_webpage_text``)
+over a corpus of large pages. Every page is cleaned by both implementations
+and the outputs must be identical; throughput is reported in MB/s.
+
+The corpus is either a directory of saved raw pages (``.txt``/``.md``) or
+synthetic pages mixing prose, navigation, markdown links, images, promo
+lines and symbols.
+
+Usage:
+    python -m benchmarks.clean_webpage --pages 20 --page-mb 2
+    python -m benchmarks.clean_webpage --corpus ./saved_pages
+"""
+import os
+import re
+import time
+import random
+import argparse
+
+from agent.tools.web_scraping import clean_webpage_text
+
+
+def legacy_clean_webpage_text(text: str) -> str:
+    """The original implementation: whole-text re.sub passes, then a line loop."""
+
+    text = re.sub(r'\!\[.*?\]\(.*?\)', '', text)
+    text = re.sub(r'\[.*?\]\(.*?\)', '', text)
+
+    patterns_to_remove = [
+        r"Black Friday sale is live now.*",
+        r"Use this code.*",
+        r"Try Bitscale Now.*",
+        r"Need more information.*",
+        r"Back to Directory.*"
+    ]
+
+    for p in patterns_to_remove:
+        text = re.sub(p, '', text, flags=re.IGNORECASE)
+
+    text = re.sub(r'[^\w\s.,:/\-()]+', '', text)
+
+    lines = text.split("\n")
+
+    cleaned_lines = []
+    seen = set()
+
+    for line in lines:
+        line = line.strip()
+
+        if not line or len(line) < 3:
+            continue
+
+        if line.isupper() and len(line.split()) <= 3:
+            continue
+
+        if line in seen:
+            continue
+
+        seen.add(line)
+        cleaned_lines.append(line)
+
+    return "\n".join(cleaned_lines)
+
+
+WORDS = (
+    "startup revenue market growth seed series funding team product customers pricing "
+    "platform enterprise retention churn margin investors founders traction pipeline"
+).split()
+
+NAVIGATION = ["HOME", "ABOUT US", "PRICING", "Back to Directory", "Sign in", "Menu", "Contact"]
+
+PROMOS = [
+    "Black Friday sale is live now - 50% off",
+    "use this code SAVE20 at checkout",
+    "Try Bitscale Now for free",
+    "Need more information? Talk to sales",
+]
+
+
+def synthetic_page(size_bytes: int, rng: random.Random) -> str:
+    """Build a raw page of roughly ``size_bytes`` with the noise Tavily extracts."""
+    lines = []
+    size = 0
+    while size < size_bytes:
+        kind = rng.random()
+        if kind < 0.15:
+            line = rng.choice(NAVIGATION)
+        elif kind < 0.25:
+            line = f"See [{rng.choice(WORDS)}](https://example.com/{rng.randrange(1000)}) for details"
+        elif kind < 0.30:
+            line = f"![{rng.choice(WORDS)} logo](https://cdn.example.com/{rng.randrange(1000)}.png)"
+        elif kind < 0.35:
+            line = f"{rng.choice(WORDS).title()} update. {rng.choice(PROMOS)}"
+        elif kind < 0.40:
+            line = "★ ★ ★ — ✓ ✓ → " + rng.choice(WORDS)
+        elif kind < 0.45:
+            line = ""
+        else:
+            line = " ".join(rng.choice(WORDS) for _ in range(rng.randrange(6, 30))) + "."
+        lines.append(line)
+        size += len(line) + 1
+    return "\n".join(lines)
+
+
+def load_corpus(args) -> list:
+    if args.corpus:
+        pages = []
+        for dirpath, _, filenames in os.walk(args.corpus):
+            for filename in sorted(filenames):
+                if filename.lower().endswith((".txt", ".md")):
+                    with open(os.path.join(dirpath, filename), encoding="utf-8", errors="ignore") as f:
+                        pages.append(f.read())
+        return pages
+
+    rng = random.Random(args.seed)
+    return [synthetic_page(int(args.page_mb * 1024 * 1024), rng) for _ in range(args.pages)]
+
+
+def throughput(fn, pages: list, repeat: int) -> float:
+    """Return the best MB/s of ``fn`` over the corpus across ``repeat`` runs."""
+    megabytes = sum(len(page.encode("utf-8")) for page in pages) / (1024 * 1024)
+    best = float("inf")
+    for _ in range(repeat):
+        start = time.perf_counter()
+        for page in pages:
+            fn(page)
+        best = min(best, time.perf_counter() - start)
+    return megabytes / best
+
+
+def main(args):
+    pages = load_corpus(args)
+    if not pages:
+        raise SystemExit("No pages to benchmark.")
+
+    mismatches = sum(clean_webpage_text(page) != legacy_clean_webpage_text(page) for page in pages)
+    if mismatches:
+        raise SystemExit(f"Output mismatch on {mismatches} of {len(pages)} pages.")
+    print(f"Outputs identical on {len(pages)} pages.")
+
+    legacy = throughput(legacy_clean_webpage_text, pages, args.repeat)
+    current = throughput(clean_webpage_text, pages, args.repeat)
+
+    print(f"{'implementation':>14} {'MB/s':>8}")
+    print(f"{'legacy':>14} {legacy:>8.1f}")
+    print(f"{'single-pass':>14} {current:>8.1f}")
+    print(f"{'speedup':>14} {current / legacy:>7.2f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--corpus", help="Directory of saved raw pages; synthetic pages are used if omitted.")
+    parser.add_argument("--pages", type=int, default=20, help="Number of synthetic pages.")
+    parser.add_argument("--page-mb", type=float, default=2.0, help="Size of each synthetic page in MB.")
+    parser.add_argument("--repeat", type=int, default=3)
+    parser.add_argument("--seed", type=int, default=0)
+    args = parser.parse_args()
+
+    main(args)
@@ -0,0 +1,81 @@
+"""
+Cost of converting the conversation history to OpenAI messages per turn.
+
+Compares re-converting the whole LangChain history with ``convert_msg_to_dict``
+on every turn against ``convert_messages``, which memoizes conversions by
+message id so only the messages appended since the last turn are converted.
+Histories are made of realistic turns (user question, assistant tool call,
+tool result, assistant answer).
+
+Usage:
+    python -m benchmarks.message_conversion --sizes 10 100 1000
+"""
+import os
+import json
+import time
+import uuid
+import argparse
+
+from langchain_core.messages import HumanMessage, AIMessage, ToolMessage
+
+
+def build_history(size: int) -> list:
+    """Build ``size`` messages with ids, as they come out of the checkpointer."""
+    messages = []
+    while len(messages) < size:
+        i = len(messages)
+        call_id = f"call_{i}"
+        messages += [
+            HumanMessage(content=f"Evaluate startup number {i} for our fund.", id=str(uuid.uuid4())),
+            AIMessage(
+                content="",
+                tool_calls=[{
+                    "name": "web_search",
+                    "args": {"query": f"startup {i} funding market size competitors", "filters": {"sector": "fintech"}},
+                    "id": call_id,
+                }],
+                id=str(uuid.uuid4()),
+            ),
+            ToolMessage(content=json.dumps({"results": [{"title": "t", "content": "c" * 800}] * 3}), tool_call_id=call_id, id=str(uuid.uuid4())),
+            AIMessage(content="Score: 72/100. Recommendation: follow up. " * 10, id=str(uuid.uuid4())),
+        ]
+    return messages[:size]
+
+
+def per_turn(fn, history: list, repeat: int) -> float:
+    """Best seconds per call of ``fn`` on ``history`` plus one new user message, as on a real turn."""
+    best = float("inf")
+    for _ in range(repeat):
+        messages = history + [HumanMessage(content="And the next one?", id=str(uuid.uuid4()))]
+        start = time.perf_counter()
+        fn(messages)
+        best = min(best, time.perf_counter() - start)
+    return best
+
+
+def main(args):
+    from agent.agent import convert_msg_to_dict, convert_messages
+
+    def full(messages):
+        return [convert_msg_to_dict(msg) for msg in messages]
+
+    print(f"{'messages':>8} {'full (us)':>10} {'memoized (us)':>14} {'speedup':>8}")
+    for size in args.sizes:
+        history = build_history(size - 1)
+        # Previous turns already converted the existing history.
+        assert convert_messages(history) == full(history)
+
+        baseline = per_turn(full, history, args.repeat)
+        memoized = per_turn(convert_messages, history, args.repeat)
+        print(f"{size:>8} {baseline * 1e6:>10.1f} {memoized * 1e6:>14.1f} {baseline / memoized:>7.1f}x")
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", type=int, nargs="+", default=[10, 100, 1000])
+    parser.add_argument("--repeat", type=int, default=20)
+    args = parser.parse_args()
+
+    os.environ.setdefault("CHECKPOINT_BACKEND", "memory")
+
+    main(args)
@@ -0,0 +1,147 @@
+"""
+Offline check of tiered model routing.
+
+Runs the agent graph against the stub model server with a responder that
+asks for a web_search on the first call of a turn (and a web_scrap after
+it for the two-hop scenario) and answers once tool results are present,
+and stubbed internal tools. Tool planning stays on the planner tier; after
+tool results or for long-form requests the planner call is stopped at its
+first answer token and the answer is written on the final tier. For each
+scenario it records which model served each completion and compares the
+tier sequence with the expected one, then prints the per-tier metrics from
+/metrics. tests/test_model_routing.py runs the same scenarios.
+
+Exits with a non-zero status if any scenario is routed differently.
+
+Usage:
+    python -m benchmarks.model_routing
+"""
+import os
+import sys
+import json
+import uuid
+import asyncio
+import argparse
+
+from benchmarks.stub_openai import create_app, serve_in_background
+
+# (name, query, mode, expected tiers of the completions in order)
+SCENARIOS = [
+    ("tool planning then answer", "What is the latest funding news about Acme Robotics?", "chat", ["planner", "planner", "final"]),
+    ("two-hop tool planning", "Open the top result about Acme Robotics and tell me what they sell.", "chat", ["planner", "planner", "planner", "final"]),
+    ("short reply without tools", "Thanks, that's all.", "chat", ["planner"]),
+    ("long-form request", "Draft an email to the founder declining politely.", "chat", ["planner", "final"]),
+    ("long pasted pitch", "Our startup builds payment rails for SMBs. " * 60, "chat", ["planner", "final"]),
+    ("structured evaluation", "Company: Acme\nMarket: robotics\nWe automate warehouses.", "evaluate", ["final"]),
+]
+
+EVALUATION = {
+    **{name: {"explanation": "stub", "score": 10} for name in (
+        "sector_alignment", "financial_strength", "customer_metrics",
+        "team_strength", "market_soundness", "soft_criteria",
+    )},
+    "hard_filters": {name: False for name in (
+        "pre_revenue", "tam_below_800m", "ltv_cac_below_2",
+        "fintech_without_license", "no_path_to_profitability",
+    )},
+    "hard_filter_notes": "",
+}
+
+served = []
+
+
+def tool_call(name: str, arguments: dict) -> dict:
+    return {
+        "role": "assistant",
+        "content": None,
+        "tool_calls": [{
+            "id": f"call_{uuid.uuid4().hex[:8]}",
+            "type": "function",
+            "function": {"name": name, "arguments": json.dumps(arguments)},
+        }],
+    }
+
+
+def responder(body: dict) -> dict:
+    """
+    Plan a web_search (then a web_scrap for "Open ..." queries) and answer
+    once the tool results are in; short and long-form requests are answered
+    directly.
+    """
+    served.append(body["model"])
+
+    if body.get("response_format"):
+        return {"role": "assistant", "content": json.dumps(EVALUATION)}
+
+    messages = body["messages"]
+    last_user = max(i for i, m in enumerate(messages) if m["role"] == "user")
+    tool_results = sum(m["role"] == "tool" for m in messages[last_user:])
+    query = messages[last_user]["content"]
+
+    if query.startswith(("Thanks", "Draft", "Our startup")):
+        return {"role": "assistant", "content": "stub answer"}
+    if not tool_results:
+        return tool_call("web_search", {"query": query})
+    if query.startswith("Open") and tool_results == 1:
+        return tool_call("web_scrap", {"urls": ["https://example.com/acme"]})
+    return {"role": "assistant", "content": "stub answer"}
+
+
+async def route_scenarios(api_key: str = "stub") -> list:
+    """
+    Run every scenario through the agent graph; OPENAI_BASE_URL must point at
+    the stub server running ``responder``.
+
+    Returns:
+        list: ``(name, expected tiers, routed tiers)`` per scenario.
+    """
+    import agent.agent as agent
+    from agent.routing import MODEL_TIERS
+
+    for name in ("web_search", "web_scrap", "rag_retrieve", "rag_fetch"):
+        agent.TOOL_REGISTRY[name] = lambda **kwargs: {"results": []}
+
+    tiers_by_model = {model: tier for tier, model in MODEL_TIERS.items()}
+    outcomes = []
+    for name, query, mode, expected in SCENARIOS:
+        served.clear()
+        config = {"configurable": {"thread_id": str(uuid.uuid4()), "api_key": api_key}}
+        state = {
+            "query": query,
+            "messages": [{"role": "user", "content": query}],
+            "external_tools": [],
+            "tool_results": None,
+            "mode": mode,
+            "evaluation": None,
+        }
+        await agent.get_graph().ainvoke(state, config)
+        outcomes.append((name, expected, [tiers_by_model.get(model, model) for model in served]))
+    return outcomes
+
+
+async def main(args) -> int:
+    from agent.routing import routing_stats
+
+    failures = 0
+    print(f"{'scenario':<28} {'expected':<30} {'routed':<30} result")
+    for name, expected, routed in await route_scenarios():
+        ok = routed == expected
+        failures += not ok
+        print(f"{name:<28} {','.join(expected):<30} {','.join(routed):<30} {'ok' if ok else 'MISMATCH'}")
+
+    print(json.dumps(routing_stats(), indent=2))
+    return 1 if failures else 0
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--latency", type=float, default=0.01, help="Stub completion latency in seconds.")
+    parser.add_argument("--port", type=int, default=8766)
+    args = parser.parse_args()
+
+    serve_in_background(create_app(latency_s=args.latency, responder=responder), args.port)
+    os.environ["OPENAI_BASE_URL"] = f"http://127.0.0.1:{args.port}/v1"
+    os.environ["LLM_ROUTING"] = "tiered"
+    os.environ.setdefault("CHECKPOINT_BACKEND", "memory")
+
+    sys.exit(asyncio.run(main(args)))
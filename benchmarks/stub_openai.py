@@ -0,0 +1,115 @@
+"""
+Minimal OpenAI-compatible stub server used by the offline benchmarks.
+
+It implements just enough of ``/v1/chat/completions`` for the agent graph to
+run end to end, with a fixed artificial latency so that event-loop blocking
+shows up as lost throughput rather than being hidden by a fast upstream.
+"""
+import json
+import time
+import uuid
+import asyncio
+import threading
+
+import uvicorn
+from fastapi import FastAPI, Request
+from fastapi.responses import StreamingResponse
+
+
+def create_app(latency_s: float = 0.2, reply: str = "stub reply", responder=None) -> FastAPI:
+    """
+    Build the stub FastAPI app.
+
+    Args:
+        latency_s (float): Seconds to sleep before answering each completion.
+        reply (str): Assistant content returned for every completion.
+        responder (callable, optional): ``responder(body) -> message dict`` used
+            instead of ``reply`` (e.g. to return tool calls); streamed
+            completions send its content word by word and its tool calls in
+            one chunk.
+
+    Returns:
+        FastAPI: The stub application.
+    """
+    app = FastAPI()
+
+    async def stream_chunks(body):
+        message = responder(body) if responder else {"role": "assistant", "content": reply}
+        words = message["content"].split(" ") if message.get("content") else []
+        deltas = [{"content": word if i == 0 else f" {word}"} for i, word in enumerate(words)]
+        if message.get("tool_calls"):
+            deltas.append({"tool_calls": [{"index": i, **call} for i, call in enumerate(message["tool_calls"])]})
+        deltas = deltas or [{"content": ""}]
+        finish_reason = "tool_calls" if message.get("tool_calls") else "stop"
+
+        for i, delta in enumerate(deltas):
+            await asyncio.sleep(latency_s / len(deltas))
+            chunk = {
+                "id": "chatcmpl-stub",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": body.get("model", "stub"),
+                "choices": [{
+                    "index": 0,
+                    "delta": delta,
+                    "finish_reason": finish_reason if i == len(deltas) - 1 else None,
+                }],
+            }
+            yield f"data: {json.dumps(chunk)}\n\n"
+        if (body.get("stream_options") or {}).get("include_usage"):
+            chunk = {
+                "id": "chatcmpl-stub",
+                "object": "chat.completion.chunk",
+                "created": int(time.time()),
+                "model": body.get("model", "stub"),
+                "choices": [],
+                "usage": {"prompt_tokens": 1, "completion_tokens": len(deltas), "total_tokens": 1 + len(deltas)},
+            }
+            yield f"data: {json.dumps(chunk)}\n\n"
+        yield "data: [DONE]\n\n"
+
+    @app.post("/v1/chat/completions")
+    async def chat_completions(request: Request):
+        body = await request.json()
+
+        if body.get("stream"):
+            return StreamingResponse(stream_chunks(body), media_type="text/event-stream")
+
+        await asyncio.sleep(latency_s)
+
+        message = responder(body) if responder else {"role": "assistant", "content": reply}
+        return {
+            "id": f"chatcmpl-{uuid.uuid4().hex}",
+            "object": "chat.completion",
+            "created": int(time.time()),
+            "model": body.get("model", "stub"),
+            "choices": [{
+                "index": 0,
+                "finish_reason": "tool_calls" if message.get("tool_calls") else "stop",
+                "message": message,
+            }],
+            "usage": {"prompt_tokens": 1, "completion_tokens": 1, "total_tokens": 2},
+        }
+
+    return app
+
+
+def serve_in_background(app: FastAPI, port: int) -> uvicorn.Server:
+    """
+    Start ``app`` on 127.0.0.1:``port`` in a daemon thread and wait until it accepts requests.
+
+    Args:
+        app (FastAPI): Application to serve.
+        port (int): Local port to bind.
+
+    Returns:
+        uvicorn.Server: The running server; set ``should_exit`` to stop it.
+    """
+    server = uvicorn.Server(uvicorn.Config(app, host="127.0.0.1", port=port, log_level="warning"))
+    thread = threading.Thread(target=server.run, daemon=True)
+    thread.start()
+
+    while not server.started:
+        time.sleep(0.05)
+
+    return server
@@ -0,0 +1,40 @@
+"""
+Output equivalence of the single-pass clean_webpage_text with the original
+multi-pass implementation (benchmarks.clean_webpage.legacy_clean_webpage_text).
+"""
+import random
+
+import pytest
+
+from agent.tools.web_scraping import clean_webpage_text
+from benchmarks.clean_webpage import legacy_clean_webpage_text, synthetic_page
+
+PAGES = [
+    "",
+    "\n\n   \n",
+    "ab\nabc\n  abc  \nABC\nHOME\nABOUT US PAGE\nABOUT US PAGE NOW\nMixed Case Line",
+    "Revenue grew 40% in Q3.\nRevenue grew 40% in Q3.\n  Revenue grew 40% in Q3.",
+    "See [the deck](https://example.com/deck) and ![logo](https://cdn.example.com/a.png) here.",
+    "Nested [a [b] c](https://x.io) and [unclosed link(https://x.io)\n![](empty.png)",
+    "![multi\nline](x.png) link text [across\nlines](https://x.io) stays",
+    "Intro.\nBlack Friday sale is live now - 50% off\nUse this code SAVE20\nTry Bitscale Now\nBack to Directory",
+    "Prefix text black friday SALE IS LIVE NOW trailing\nkeep me. NEED MORE INFORMATION? call us",
+    "★ ★ ★ — ✓ ✓ →\n→ arrows → only\nemoji 🚀 launch 🚀 day\n***\n...",
+    # Characters re.IGNORECASE folds onto ASCII letters (long s, dotless i, dotted I, Kelvin sign).
+    "Uſe this code now\nUSE THIS CODE\nTry Bitſcale Now\nNeed more ınformation\nNeed more İnformation\nBacK to Directory",
+    "Back to DirectoryK\nſtartup ſeed round\nıntegration İstanbul office\nKPI dashboard",
+    "Tabs\tand non-breaking spaces\r\nwindows line\r\nDéjà vu café résumé naïve",
+    "Ünïcödé ŞİRKET İSTANBUL\nÜNÏCÖDÉ ŞİRKET İSTANBUL\nstraße STRASSE",
+]
+
+
+@pytest.mark.parametrize("page", PAGES)
+def test_matches_legacy_on_fixed_pages(page):
+    assert clean_webpage_text(page) == legacy_clean_webpage_text(page)
+
+
+def test_matches_legacy_on_synthetic_pages():
+    rng = random.Random(0)
+    for _ in range(5):
+        page = synthetic_page(64 * 1024, rng)
+        assert clean_webpage_text(page) == legacy_clean_webpage_text(page)
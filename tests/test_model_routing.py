@@ -0,0 +1,64 @@
+"""
+Tiered model routing, checked against the stub model server with the
+scenarios of benchmarks.model_routing.
+"""
+import os
+import uuid
+import asyncio
+import socket
+
+import pytest
+
+os.environ.setdefault("CHECKPOINT_BACKEND", "memory")
+
+from benchmarks import model_routing
+from benchmarks.stub_openai import create_app, serve_in_background
+
+
+@pytest.fixture(scope="module")
+def stub_server():
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        port = sock.getsockname()[1]
+    server = serve_in_background(create_app(latency_s=0.0, responder=model_routing.responder), port)
+    yield f"http://127.0.0.1:{port}/v1"
+    server.should_exit = True
+
+
+@pytest.fixture
+def tiered(stub_server, monkeypatch):
+    monkeypatch.setenv("OPENAI_BASE_URL", stub_server)
+    monkeypatch.setattr("agent.routing.LLM_ROUTING", "tiered")
+
+    import agent.agent as agent
+    for name in agent.Internal_Tools:
+        monkeypatch.setitem(agent.TOOL_REGISTRY, name, lambda **kwargs: {"results": []})
+
+
+def test_scenarios_are_routed_as_expected(tiered):
+    outcomes = asyncio.run(model_routing.route_scenarios(api_key=f"routing-{uuid.uuid4().hex}"))
+    assert [(name, routed) for name, _, routed in outcomes] == [(name, expected) for name, expected, _ in outcomes]
+
+
+def test_stopped_planner_call_streams_no_tokens(tiered):
+    import agent.agent as agent
+
+    query = model_routing.SCENARIOS[0][1]
+
+    async def stream():
+        config = {"configurable": {"thread_id": str(uuid.uuid4()), "api_key": f"routing-{uuid.uuid4().hex}", "stream_tokens": True}}
+        state = {
+            "query": query,
+            "messages": [{"role": "user", "content": query}],
+            "external_tools": [],
+            "tool_results": None,
+            "mode": "chat",
+            "evaluation": None,
+        }
+        return [
+            event["content"]
+            async for event in agent.get_graph().astream(state, config, stream_mode="custom")
+            if event.get("event") == "token"
+        ]
+
+    assert "".join(asyncio.run(stream())) == "stub answer"